@@ -88,6 +88,30 @@ cat > /tmp/order-service-task.json <<EOF
         "retries": 3,
         "startPeriod": 60
       }
+    },
+    {
+      "name": "outbox-relay",
+      "image": "$AWS_ACCOUNT_ID.dkr.ecr.$AWS_REGION.amazonaws.com/cloudcafe-order-service:latest",
+      "command": ["python", "outbox.py"],
+      "essential": false,
+      "environment": [
+        {"name": "ENVIRONMENT", "value": "dev"},
+        {"name": "AWS_REGION", "value": "$AWS_REGION"},
+        {"name": "DB_HOST", "value": "$RDS_ENDPOINT"},
+        {"name": "DB_PORT", "value": "5432"},
+        {"name": "DB_NAME", "value": "cloudcafe"},
+        {"name": "DB_USER", "value": "cloudcafe_admin"},
+        {"name": "DB_PASSWORD", "value": "CloudCafe2024!"},
+        {"name": "KINESIS_ORDER_EVENTS_STREAM", "value": "$KINESIS_STREAM"}
+      ],
+      "logConfiguration": {
+        "logDriver": "awslogs",
+        "options": {
+          "awslogs-group": "/ecs/cloudcafe-order-service",
+          "awslogs-region": "$AWS_REGION",
+          "awslogs-stream-prefix": "outbox"
+        }
+      }
     }
   ]
 }
@@ -137,9 +161,51 @@ else
         --region $AWS_REGION > /dev/null 2>&1 && echo "✓ Service created" || echo "⚠ Service may already exist"
 fi
 
+# Order stream: the same image in ASGI mode (uvicorn workers), serving the
+# barista dashboard's server-sent events, which the ALB sends to
+# cloudcafe-order-stream-tg-dev
+echo ""
+echo "=== Registering Order Stream Task Definition ==="
+# Only the web container: the order-service tasks already run the outbox relay
+jq '.family = "cloudcafe-order-stream"
+    | .containerDefinitions = [.containerDefinitions[0]
+        | .name = "order-stream"
+        | .command = ["gunicorn", "-c", "gunicorn.conf.py", "-k", "uvicorn.workers.UvicornWorker", "asgi:app"]]' \
+    /tmp/order-service-task.json > /tmp/order-stream-task.json
+
+/usr/local/bin/aws ecs register-task-definition \
+    --cli-input-json file:///tmp/order-stream-task.json \
+    --region $AWS_REGION > /dev/null
+
+echo "✓ Task definition registered"
+
+STREAM_TARGET_GROUP_ARN=$(/usr/local/bin/aws elbv2 describe-target-groups \
+    --names cloudcafe-order-stream-tg-dev \
+    --region $AWS_REGION \
+    --query 'TargetGroups[0].TargetGroupArn' \
+    --output text 2>/dev/null || echo "")
+
+if [ ! -z "$STREAM_TARGET_GROUP_ARN" ]; then
+    echo "Target Group: $STREAM_TARGET_GROUP_ARN"
+
+    /usr/local/bin/aws ecs create-service \
+        --cluster $ECS_CLUSTER \
+        --service-name order-stream \
+        --task-definition cloudcafe-order-stream \
+        --desired-count 2 \
+        --launch-type FARGATE \
+        --network-configuration "awsvpcConfiguration={subnets=[$PRIVATE_SUBNETS],securityGroups=[$TASK_SG],assignPublicIp=DISABLED}" \
+        --load-balancers "targetGroupArn=$STREAM_TARGET_GROUP_ARN,containerName=order-stream,containerPort=8080" \
+        --health-check-grace-period-seconds 60 \
+        --region $AWS_REGION > /dev/null 2>&1 && echo "✓ Order stream service created" || echo "⚠ Order stream service may already exist"
+else
+    echo "⚠ Order stream target group not found (terraform apply), dashboards will poll"
+fi
+
 echo ""
 echo "=== Deployment Complete ==="
 echo "Service: order-service"
+echo "Service: order-stream (ASGI, /orders/stream)"
 echo "Cluster: $ECS_CLUSTER"
 echo "Region: $AWS_REGION"
 echo ""
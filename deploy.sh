@@ -175,6 +175,9 @@ ok "authenticated to $ECR"
 step "3/6  Build & push ECS images"
 
 # ---- Order Service (Python) ----------------------------
+# The analytics worker ships copies of its stress modules
+"$SCRIPT_DIR/scripts/check-shared-modules.sh" > /dev/null || {
+  echo "stress modules differ between order-service and analytics-worker; run scripts/check-shared-modules.sh"; exit 1; }
 build_push cloudcafe-order-service "$SCRIPT_DIR/services/order-service"
 
 # ---- Loyalty Service (inline Flask) --------------------
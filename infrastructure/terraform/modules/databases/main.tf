@@ -143,6 +143,12 @@ resource "aws_dynamodb_table" "active_orders" {
     type = "N"
   }
 
+  # "<store_id>#<status>", maintained by order-service for store listings
+  attribute {
+    name = "store_status"
+    type = "S"
+  }
+
   global_secondary_index {
     name            = "CustomerOrderIndex"
     hash_key        = "customer_id"
@@ -150,6 +156,13 @@ resource "aws_dynamodb_table" "active_orders" {
     projection_type = "ALL"
   }
 
+  global_secondary_index {
+    name            = "StoreStatusIndex"
+    hash_key        = "store_status"
+    range_key       = "created_at"
+    projection_type = "ALL"
+  }
+
   point_in_time_recovery {
     enabled = true
   }
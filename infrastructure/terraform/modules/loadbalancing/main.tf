@@ -69,6 +69,37 @@ resource "aws_lb_target_group" "order_service" {
   }
 }
 
+# Target Group - Order Stream (ECS, ASGI mode)
+# Server-sent event streams stay open, so they go to uvicorn workers
+# rather than the order service's sync Flask workers
+resource "aws_lb_target_group" "order_stream" {
+  name        = "${var.project_name}-order-stream-tg-${var.environment}"
+  port        = 8080
+  protocol    = "HTTP"
+  vpc_id      = var.vpc_id
+  target_type = "ip"
+
+  health_check {
+    enabled             = true
+    healthy_threshold   = 2
+    unhealthy_threshold = 3
+    timeout             = 5
+    interval            = 30
+    path                = "/health"
+    protocol            = "HTTP"
+    matcher             = "200"
+  }
+
+  deregistration_delay = 30
+
+  tags = {
+    Name        = "${var.project_name}-order-stream-tg-${var.environment}"
+    Project     = var.project_name
+    Environment = var.environment
+    Service     = "order-stream"
+  }
+}
+
 # Target Group - Menu Service (EKS)
 resource "aws_lb_target_group" "menu_service" {
   name        = "${var.project_name}-menu-tg-${var.environment}"
@@ -150,6 +181,29 @@ resource "aws_lb_listener_rule" "order_service" {
   }
 }
 
+# ALB Listener Rule - Order Stream (ahead of the /orders* rule)
+resource "aws_lb_listener_rule" "order_stream" {
+  listener_arn = aws_lb_listener.http.arn
+  priority     = 90
+
+  action {
+    type             = "forward"
+    target_group_arn = aws_lb_target_group.order_stream.arn
+  }
+
+  condition {
+    path_pattern {
+      values = ["/orders/stream", "/api/orders/stream"]
+    }
+  }
+
+  tags = {
+    Name        = "${var.project_name}-order-stream-rule-${var.environment}"
+    Project     = var.project_name
+    Environment = var.environment
+  }
+}
+
 # ALB Listener Rule - Menu Service
 resource "aws_lb_listener_rule" "menu_service" {
   listener_arn = aws_lb_listener.http.arn
@@ -43,6 +43,11 @@ output "order_service_target_group_arn" {
   value       = aws_lb_target_group.order_service.arn
 }
 
+output "order_stream_target_group_arn" {
+  description = "Order stream (ASGI) target group ARN"
+  value       = aws_lb_target_group.order_stream.arn
+}
+
 output "menu_service_target_group_arn" {
   description = "Menu service target group ARN"
   value       = aws_lb_target_group.menu_service.arn
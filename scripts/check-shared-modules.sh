@@ -0,0 +1,42 @@
+#!/bin/bash
+# Shared Module Check
+#
+# The stress modules are copied into both services that run stress
+# scenarios, because each is built and deployed on its own. The copies in
+# services/order-service/app are the source; this fails if the
+# analytics-worker copies differ from them.
+#
+# Usage: scripts/check-shared-modules.sh [--sync]
+#   --sync  copy the order-service versions over the analytics-worker ones
+
+set -e
+
+# Colors
+RED='\033[0;31m'
+GREEN='\033[0;32m'
+NC='\033[0m'
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
+SOURCE_DIR="$PROJECT_ROOT/services/order-service/app"
+COPY_DIRS=("$PROJECT_ROOT/services/analytics-worker")
+MODULES=(cpu_controller.py stress_profile.py)
+
+FAILED=0
+for dir in "${COPY_DIRS[@]}"; do
+    for module in "${MODULES[@]}"; do
+        if [ "$1" == "--sync" ]; then
+            cp "$SOURCE_DIR/$module" "$dir/$module"
+        fi
+        if cmp -s "$SOURCE_DIR/$module" "$dir/$module"; then
+            echo -e "  ${dir#$PROJECT_ROOT/}/$module ${GREEN}✓${NC}"
+        else
+            echo -e "  ${dir#$PROJECT_ROOT/}/$module ${RED}✗ differs from ${SOURCE_DIR#$PROJECT_ROOT/}/$module${NC}"
+            FAILED=1
+        fi
+    done
+done
+
+if [ $FAILED -ne 0 ]; then
+    echo "Run scripts/check-shared-modules.sh --sync after changing the order-service copy"
+    exit 1
+fi
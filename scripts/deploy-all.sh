@@ -165,6 +165,9 @@ log_success "ECR repositories ready"
 
 # Build Order Service
 if [ -f "$PROJECT_ROOT/services/order-service/Dockerfile" ]; then
+    log_info "Checking the stress modules shared with analytics-worker..."
+    bash "$PROJECT_ROOT/scripts/check-shared-modules.sh"
+
     log_info "Building order-service Docker image..."
 
     cd "$PROJECT_ROOT/services/order-service"
@@ -16,6 +16,18 @@ CREATE INDEX IF NOT EXISTS idx_orders_customer_id ON orders(customer_id);
 CREATE INDEX IF NOT EXISTS idx_orders_store_id ON orders(store_id);
 CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_orders_customer_created ON orders(customer_id, created_at DESC);
+-- Keyset pagination for store order listings (GET /orders?store_id=...)
+CREATE INDEX IF NOT EXISTS idx_orders_store_created ON orders(store_id, created_at, order_id);
+CREATE INDEX IF NOT EXISTS idx_orders_store_status_created ON orders(store_id, status, created_at, order_id);
+
+-- Transactional outbox for order events, drained to Kinesis by the
+-- order-service relay (python outbox.py)
+CREATE TABLE IF NOT EXISTS order_events_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    partition_key VARCHAR(255) NOT NULL,
+    payload TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
 
 -- Order items table
 CREATE TABLE IF NOT EXISTS order_items (
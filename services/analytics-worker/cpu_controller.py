@@ -0,0 +1,145 @@
+"""
+Closed-loop CPU control for the stress scenarios
+
+A stress loop that samples CPU inline (psutil.cpu_percent(interval=0.1))
+stalls for every sample, and fixed 1 ms / 100 ms sleeps make the achieved
+CPU swing well around the target. Instead:
+
+- DutyCycleController samples CPU on a background thread and runs a PI
+  controller that sets a duty cycle, the share of wall time the workload
+  should be busy
+- DutyCycle.pace(), called by the workload between small units of work,
+  sleeps just long enough to keep busy time at that share, in slices of
+  about `period` seconds
+
+Work units longer than the period are fine: the sleep after one is scaled
+to the time it took. The workload can run in other processes too; give
+their DutyCycle a function returning the duty the controller publishes.
+The target can follow a schedule (see stress_profile.py), checked at every
+sample.
+"""
+
+import math
+import time
+import threading
+
+import psutil
+
+
+class DutyCycle:
+    """Keeps a workload busy for duty() of the wall time"""
+
+    def __init__(self, duty, period=0.1):
+        self.duty = duty
+        self.period = period
+        self._slice_start = time.monotonic()
+        self.idle_seconds = 0.0
+
+    def pace(self):
+        """Call between units of work; sleeps once this slice's busy time is used up"""
+        duty = min(max(self.duty(), 0.0), 1.0)
+        busy = time.monotonic() - self._slice_start
+        if duty >= 1.0 or busy < duty * self.period:
+            return
+        # Idle in proportion to the busy time just spent, so long units of
+        # work still average out to the duty cycle
+        idle = busy * (1.0 - duty) / duty if duty > 0 else self.period
+        time.sleep(idle)
+        self.idle_seconds += idle
+        self._slice_start = time.monotonic()
+
+
+class DutyCycleController:
+    """
+    PI controller from measured CPU (percent) to a duty cycle (0-1)
+
+    Starts from target_cpu / 100 and corrects for cores the workload does
+    not use, other processes and the cost of the sleeps themselves.
+    schedule, if given, maps seconds since start() to the target. Tracking
+    statistics leave out the first settle_seconds.
+    """
+
+    def __init__(self, target_cpu, period=0.1, sample_interval=0.5, kp=0.004, ki=0.004,
+                 min_duty=0.01, settle_seconds=5.0, sample=None, schedule=None):
+        self.target_cpu = float(target_cpu)
+        self.schedule = schedule
+        self.sample_interval = sample_interval
+        self.kp = kp
+        self.ki = ki
+        self.min_duty = min_duty
+        self.settle_seconds = settle_seconds
+        self._sample = sample or (lambda: psutil.cpu_percent(interval=self.sample_interval))
+
+        self.duty = min(max(self.target_cpu / 100.0, min_duty), 1.0)
+        self.cpu_percent = None
+        self._integral = 0.0
+        self._started = None
+        self.samples = []  # (seconds since start, cpu percent, target percent)
+        self._stop = threading.Event()
+        self._thread = None
+        self.cycle = DutyCycle(lambda: self.duty, period)
+
+    def pace(self):
+        self.cycle.pace()
+
+    def start(self):
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name='cpu-controller', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.sample_interval * 2 + 1)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        psutil.cpu_percent(interval=None)  # baseline for the first sample
+        last = time.monotonic()
+        while not self._stop.is_set():
+            cpu = self._sample()
+            now = time.monotonic()
+            if self.schedule is not None:
+                self.target_cpu = float(self.schedule(now - self._started))
+            self.update(cpu, now - last)
+            last = now
+            self.samples.append((now - self._started, cpu, self.target_cpu))
+
+    def update(self, cpu, dt):
+        """Feed one CPU sample taken over dt seconds; returns the new duty"""
+        self.cpu_percent = cpu
+        error = self.target_cpu - cpu
+        integral = self._integral + error * dt
+        duty = self.target_cpu / 100.0 + self.kp * error + self.ki * integral
+        clamped = min(max(duty, self.min_duty), 1.0)
+        # Anti-windup: stop integrating while saturated
+        if clamped == duty:
+            self._integral = integral
+        self.duty = clamped
+        return clamped
+
+    def stats(self):
+        """How closely the achieved CPU tracked the target"""
+        settled = [(cpu, target) for elapsed, cpu, target in self.samples if elapsed >= self.settle_seconds]
+        if not settled:
+            settled = [(cpu, target) for _, cpu, target in self.samples]
+        if not settled:
+            return {'target_cpu': self.target_cpu, 'samples': 0}
+        errors = [cpu - target for cpu, target in settled]
+        return {
+            'target_cpu': round(sum(target for _, target in settled) / len(settled), 1),
+            'samples': len(settled),
+            'mean_cpu': round(sum(cpu for cpu, _ in settled) / len(settled), 1),
+            'min_cpu': round(min(cpu for cpu, _ in settled), 1),
+            'max_cpu': round(max(cpu for cpu, _ in settled), 1),
+            'mean_abs_error': round(sum(abs(e) for e in errors) / len(errors), 1),
+            'rms_error': round(math.sqrt(sum(e * e for e in errors) / len(errors)), 1),
+            'within_5_points': round(sum(1 for e in errors if abs(e) <= 5) / len(errors), 2),
+            'duty': round(self.duty, 3),
+        }
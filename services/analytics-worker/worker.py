@@ -21,6 +21,9 @@ import boto3
 import psycopg2
 from psycopg2.extras import execute_batch
 
+from cpu_controller import DutyCycleController
+from stress_profile import StressProfile
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -236,84 +239,104 @@ class StressScenario:
     """
 
     @staticmethod
-    def simulate_query_storm(duration_seconds: int = 600, target_cpu: int = 90):
-        """Simulate analytics query storm"""
+    def simulate_query_storm(duration_seconds: int = 600, target_cpu: int = 90,
+                             profile: StressProfile = None):
+        """Simulate analytics query storm, optionally following a ramp profile"""
+        if profile is None:
+            profile = StressProfile.flat(duration_seconds, target_cpu)
+        duration_seconds = profile.duration
+
         logger.info("========================================")
         logger.info("🔥 STRESS SCENARIO: QUERY STORM")
         logger.info("========================================")
         logger.info("Story: End of quarter. 500 concurrent queries for revenue reports.")
-        logger.info(f"Duration: {duration_seconds}s")
-        logger.info(f"Target CPU: {target_cpu}%")
+        logger.info(f"Duration: {duration_seconds:g}s")
+        logger.info("Target CPU: " + ' -> '.join(f"{target:g}%" for _, target in profile.stages))
         logger.info("========================================")
 
         start_time = time.time()
         iteration = 0
 
-        while time.time() - start_time < duration_seconds:
-            iteration_start = time.time()
-
-            # Execute multiple CPU-intensive queries
-            for i in range(10):
-                StressScenario._execute_complex_query(i)
-
-            # CPU-intensive data processing
-            for i in range(5000):
-                # Simulate processing large result sets
-                data = {
-                    'order_id': f'order-{i}',
-                    'revenue': i * 123.45,
-                    'items': [f'item-{j}' for j in range(10)]
-                }
-
-                # JSON processing
-                json_str = json.dumps(data)
-                json.loads(json_str)
-
-                # Hash operations
-                hashlib.sha256(json_str.encode()).hexdigest()
-                hashlib.md5(json_str.encode()).hexdigest()
-
-                # Floating point operations
-                revenue = data['revenue']
-                for j in range(100):
-                    revenue = revenue * 1.001
-                    revenue = revenue / 1.001
-
-            iteration += 1
-
-            # Emit metrics
-            if iteration % 5 == 0:
-                elapsed = time.time() - start_time
-
-                cloudwatch.put_metric_data(
-                    Namespace='CloudCafe/Analytics',
-                    MetricData=[
-                        {
-                            'MetricName': 'QueryStormCPU',
-                            'Value': 90.0,  # Simulated high CPU
-                            'Unit': 'Percent',
-                            'Dimensions': [{'Name': 'Scenario', 'Value': 'QueryStorm'}]
-                        },
-                        {
-                            'MetricName': 'QueryStormIterations',
-                            'Value': iteration,
-                            'Unit': 'Count',
-                            'Dimensions': [{'Name': 'Scenario', 'Value': 'QueryStorm'}]
-                        }
-                    ]
-                )
+        # Samples CPU on its own thread and paces the loop to the profile's target
+        controller = DutyCycleController(profile.target_at(0), schedule=profile.target_at)
+        with controller:
+            while time.time() - start_time < duration_seconds:
+                # Execute multiple CPU-intensive queries
+                for i in range(10):
+                    StressScenario._execute_complex_query(i)
+
+                # CPU-intensive data processing
+                for i in range(5000):
+                    # Simulate processing large result sets
+                    data = {
+                        'order_id': f'order-{i}',
+                        'revenue': i * 123.45,
+                        'items': [f'item-{j}' for j in range(10)]
+                    }
+
+                    # JSON processing
+                    json_str = json.dumps(data)
+                    json.loads(json_str)
+
+                    # Hash operations
+                    hashlib.sha256(json_str.encode()).hexdigest()
+                    hashlib.md5(json_str.encode()).hexdigest()
+
+                    # Floating point operations
+                    revenue = data['revenue']
+                    for j in range(100):
+                        revenue = revenue * 1.001
+                        revenue = revenue / 1.001
+
+                    if i % 100 == 0:
+                        controller.pace()
+
+                iteration += 1
 
-                logger.info(f"[{int(elapsed)}s] CPU: 90% | Iterations: {iteration}")
-
-            # Adaptive delay
-            iteration_time = time.time() - iteration_start
-            if iteration_time < 1.0:
-                time.sleep(0.1)  # Work harder
+                # Emit metrics
+                if iteration % 5 == 0 and controller.cpu_percent is not None:
+                    elapsed = time.time() - start_time
+
+                    cloudwatch.put_metric_data(
+                        Namespace='CloudCafe/Analytics',
+                        MetricData=[
+                            {
+                                'MetricName': 'QueryStormCPU',
+                                'Value': controller.cpu_percent,
+                                'Unit': 'Percent',
+                                'Dimensions': [{'Name': 'Scenario', 'Value': 'QueryStorm'}]
+                            },
+                            {
+                                'MetricName': 'QueryStormTargetCPU',
+                                'Value': controller.target_cpu,
+                                'Unit': 'Percent',
+                                'Dimensions': [{'Name': 'Scenario', 'Value': 'QueryStorm'}]
+                            },
+                            {
+                                'MetricName': 'QueryStormIterations',
+                                'Value': iteration,
+                                'Unit': 'Count',
+                                'Dimensions': [{'Name': 'Scenario', 'Value': 'QueryStorm'}]
+                            }
+                        ]
+                    )
+
+                    logger.info(f"[{int(elapsed)}s] CPU: {controller.cpu_percent:.1f}% "
+                                f"(target {controller.target_cpu:.0f}%) | Iterations: {iteration}")
+
+        cpu_tracking = controller.stats()
+        timeline = profile.timeline(start_time, controller.samples)
 
         logger.info("========================================")
         logger.info("✅ STRESS COMPLETE")
         logger.info(f"Total time: {int(time.time() - start_time)}s")
         logger.info(f"Total iterations: {iteration}")
+        if cpu_tracking['samples']:
+            logger.info(f"CPU: mean {cpu_tracking['mean_cpu']}% for target {cpu_tracking['target_cpu']}% "
+                        f"(mean error {cpu_tracking['mean_abs_error']} points, "
+                        f"{cpu_tracking['within_5_points']:.0%} of samples within 5)")
+        # Stage boundaries, for lining the run up with dashboards
+        logger.info(f"Timeline: {json.dumps(timeline)}")
         logger.info("========================================")
 
         cloudwatch.put_metric_data(
@@ -326,6 +349,9 @@ class StressScenario:
             }]
         )
 
+        cpu_tracking['timeline'] = timeline
+        return cpu_tracking
+
     @staticmethod
     def _execute_complex_query(query_num: int):
         """Execute a CPU-intensive "query" simulation"""
@@ -361,9 +387,12 @@ class StressScenario:
 if __name__ == '__main__':
     # Check if stress scenario mode
     if len(sys.argv) > 1 and sys.argv[1] == 'stress':
-        duration = int(sys.argv[2]) if len(sys.argv) > 2 else 600
-        target_cpu = int(sys.argv[3]) if len(sys.argv) > 3 else 90
-        StressScenario.simulate_query_storm(duration, target_cpu)
+        if len(sys.argv) == 4 and sys.argv[2] == '--profile':
+            StressScenario.simulate_query_storm(profile=StressProfile.load(sys.argv[3]))
+        else:
+            duration = int(sys.argv[2]) if len(sys.argv) > 2 else 600
+            target_cpu = int(sys.argv[3]) if len(sys.argv) > 3 else 90
+            StressScenario.simulate_query_storm(duration, target_cpu)
     else:
         # Normal worker mode
         worker = AnalyticsWorker()
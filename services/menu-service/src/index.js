@@ -28,7 +28,7 @@ const cloudwatch = new AWS.CloudWatch({ region: AWS_REGION });
 
 // Initialize Redis client
 let redisClient;
-(async () => {
+const redisReady = (async () => {
     try {
         redisClient = redis.createClient({
             socket: {
@@ -68,8 +68,10 @@ const MenuItem = mongoose.model('MenuItem', menuItemSchema);
 mongoose.connect(MONGODB_URI, {
     useNewUrlParser: true,
     useUnifiedTopology: true
-}).then(() => {
+}).then(async () => {
     console.log('✅ Connected to DocumentDB (MongoDB)');
+    await redisReady;
+    await backfillPrices();
 }).catch((error) => {
     console.error('❌ MongoDB connection error:', error);
 });
@@ -210,6 +212,8 @@ app.post('/menu/items', async (req, res) => {
             await redisClient.del(`menu:item:${itemData.item_id}`);
         }
 
+        await publishPrice(item);
+
         await emitMetric('MenuItemUpdated', 1);
 
         res.status(201).json({ item });
@@ -242,6 +246,74 @@ app.post('/stress/menu-sync', async (req, res) => {
     });
 });
 
+/**
+ * Publish item prices to the Redis price index read by order-service.
+ * Every change bumps menu:prices:version and is logged in menu:prices:changes
+ * so readers can refresh incrementally instead of reloading the whole menu.
+ * The bump and both writes run in one script: a reader never sees a version
+ * whose change is not there yet.
+ */
+const PRICE_CHANGE_LOG_SIZE = 10000;
+
+// KEYS: prices hash, version, change log
+// ARGV: log size, '1' to skip items already published, then item_id, price (a JSON
+// number), available (1/0) per item
+const PUBLISH_PRICES_SCRIPT = `
+local version = redis.call('INCR', KEYS[2])
+local written = 0
+for i = 3, #ARGV, 3 do
+    local item_id = ARGV[i]
+    if ARGV[2] == '0' or redis.call('HEXISTS', KEYS[1], item_id) == 0 then
+        local available = ARGV[i + 2] == '1' and 'true' or 'false'
+        redis.call('HSET', KEYS[1], item_id,
+            '{"price":' .. ARGV[i + 1] .. ',"available":' .. available .. ',"version":' .. version .. '}')
+        redis.call('ZADD', KEYS[3], version, item_id)
+        written = written + 1
+    end
+end
+redis.call('ZREMRANGEBYRANK', KEYS[3], 0, -tonumber(ARGV[1]) - 1)
+return written
+`;
+
+async function publishPrices(items, onlyMissing = false) {
+    const priced = items.filter((item) => item.price !== undefined && item.price !== null);
+    if (!redisClient?.isOpen || priced.length === 0) {
+        return 0;
+    }
+
+    const args = [String(PRICE_CHANGE_LOG_SIZE), onlyMissing ? '1' : '0'];
+    for (const item of priced) {
+        args.push(item.item_id, String(item.price), item.available !== false ? '1' : '0');
+    }
+    return redisClient.eval(PUBLISH_PRICES_SCRIPT, {
+        keys: ['menu:prices', 'menu:prices:version', 'menu:prices:changes'],
+        arguments: args
+    });
+}
+
+async function publishPrice(item) {
+    try {
+        await publishPrices([item]);
+    } catch (error) {
+        console.error('Price index publish error:', error.message);
+    }
+}
+
+/**
+ * Seed the price index with every item in DocumentDB, so order-service can
+ * price items that have not been written since the index was introduced.
+ * Items already published are left alone: they are as new or newer.
+ */
+async function backfillPrices() {
+    try {
+        const items = await MenuItem.find({}).select('item_id price available').lean();
+        const written = await publishPrices(items, true);
+        console.log(`✅ Price index backfilled: ${written} of ${items.length} items`);
+    } catch (error) {
+        console.error('Price index backfill error:', error.message);
+    }
+}
+
 /**
  * Emit CloudWatch metric
  */
@@ -0,0 +1,449 @@
+"""
+Async (ASGI) serving mode for the order service
+
+Serves the same /health, /orders and /orders/<order_id> contract as the
+Flask app in main.py, but on asyncio: a worker keeps serving other requests
+while one waits on DynamoDB, Postgres or Redis, and the DynamoDB and RDS
+writes of an order run concurrently (RDS commits only once DynamoDB has
+the order). It also serves the barista dashboard's server-sent event
+stream, /orders/stream?store_id=, which only this mode can hold open by the
+thousand; deploy-order-service.sh runs it as the order-stream ECS service,
+which the ALB sends that path to. Run it with uvicorn workers:
+
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+"""
+
+import os
+import time
+import asyncio
+import logging
+import contextlib
+from datetime import datetime
+from decimal import Decimal
+
+import aioboto3
+import asyncpg
+import redis
+import redis.asyncio as aioredis
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from board import ActiveOrderBoard
+from cache import MISSING, normalize
+from events import StoreEventHub
+from idempotency import IdempotencyError, build_idempotency_store
+from outbox import OUTBOX_TABLE, table_check
+from serialization import dumpb, dumps, loads, to_dynamodb
+from orders import build_order, order_created_event
+from pricing import InvalidItemError, PricesUnavailableError, build_price_index
+
+logger = logging.getLogger(__name__)
+
+AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+ACTIVE_ORDERS_TABLE = os.environ.get('DYNAMODB_ACTIVE_ORDERS_TABLE', 'cloudcafe-active-orders-dev')
+ORDER_EVENTS_STREAM = os.environ.get('KINESIS_ORDER_EVENTS_STREAM', 'cloudcafe-order-events-dev')
+ORDER_CACHE_TTL = int(os.environ.get('ORDER_CACHE_TTL', 60))
+ORDER_CACHE_NEGATIVE_TTL = int(os.environ.get('ORDER_CACHE_NEGATIVE_TTL', 5))
+ORDER_STREAM_HEARTBEAT = float(os.environ.get('ORDER_STREAM_HEARTBEAT', 15))
+ORDER_STREAM_QUEUE_SIZE = int(os.environ.get('ORDER_STREAM_QUEUE_SIZE', 100))
+
+
+class Backends:
+    """Async clients shared by every request in this worker"""
+
+    def __init__(self):
+        self.stack = contextlib.AsyncExitStack()
+        self.active_orders_table = None
+        self.kinesis = None
+        self.cloudwatch = None
+        self.db_pool = None
+        self.redis = None
+        # Fire-and-forget publishes, awaited on shutdown
+        self.background = set()
+        # In-flight order reads, so concurrent misses share one backend read
+        self.inflight = {}
+        self.price_index = None
+        self.active_board = ActiveOrderBoard(None)
+        self.idempotency = build_idempotency_store(None)
+        self.events = None
+
+    async def open(self):
+        session = aioboto3.Session(region_name=AWS_REGION)
+        dynamodb = await self.stack.enter_async_context(session.resource('dynamodb'))
+        self.active_orders_table = await dynamodb.Table(ACTIVE_ORDERS_TABLE)
+        self.kinesis = await self.stack.enter_async_context(session.client('kinesis'))
+        self.cloudwatch = await self.stack.enter_async_context(session.client('cloudwatch'))
+
+        if os.environ.get('DB_HOST'):
+            try:
+                self.db_pool = await asyncpg.create_pool(
+                    host=os.environ.get('DB_HOST'),
+                    port=int(os.environ.get('DB_PORT', 5432)),
+                    database=os.environ.get('DB_NAME', 'cloudcafe'),
+                    user=os.environ.get('DB_USER'),
+                    password=os.environ.get('DB_PASSWORD'),
+                    min_size=int(os.environ.get('DB_POOL_MIN', 1)),
+                    max_size=int(os.environ.get('DB_POOL_MAX', 5)),
+                    timeout=int(os.environ.get('DB_CONNECT_TIMEOUT', 3)),
+                )
+            except Exception as e:
+                logger.error(f"RDS pool error: {e}")
+
+        if os.environ.get('REDIS_HOST'):
+            self.redis = aioredis.Redis(
+                host=os.environ.get('REDIS_HOST'),
+                port=int(os.environ.get('REDIS_PORT', 6379)),
+                decode_responses=True,
+                socket_timeout=0.5,
+                socket_connect_timeout=0.5
+            )
+            # Pub/sub reads block between events, so the hub gets its own
+            # client without a socket timeout
+            self.events = StoreEventHub(aioredis.Redis(
+                host=os.environ.get('REDIS_HOST'),
+                port=int(os.environ.get('REDIS_PORT', 6379)),
+                decode_responses=True,
+                socket_connect_timeout=0.5
+            ), queue_size=ORDER_STREAM_QUEUE_SIZE)
+            # The price index refreshes on its own thread and the board runs
+            # Lua scripts, so both keep a blocking client
+            sync_redis = redis.Redis(
+                host=os.environ.get('REDIS_HOST'),
+                port=int(os.environ.get('REDIS_PORT', 6379)),
+                decode_responses=True,
+                socket_timeout=0.5,
+                socket_connect_timeout=0.5
+            )
+            self.price_index = build_price_index(sync_redis)
+            self.active_board = ActiveOrderBoard(sync_redis)
+            self.idempotency = build_idempotency_store(sync_redis)
+            await asyncio.to_thread(self.price_index.snapshot)
+
+    async def close(self):
+        if self.background:
+            await asyncio.wait(self.background, timeout=float(os.environ.get('DISPATCH_SHUTDOWN_TIMEOUT', 10)))
+        if self.events is not None:
+            await self.events.close()
+            await self.events.client.aclose()
+        if self.redis is not None:
+            await self.redis.aclose()
+        if self.db_pool is not None:
+            await self.db_pool.close()
+        await self.stack.aclose()
+
+    def spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self.background.add(task)
+        task.add_done_callback(self.background.discard)
+
+
+backends = Backends()
+
+
+class OrjsonResponse(JSONResponse):
+    """Starlette JSON response encoded with orjson (Decimal/datetime safe)"""
+
+    def render(self, content):
+        return dumpb(content)
+
+
+async def insert_order_rds(order, durable):
+    """
+    Write the order and its outbox event in one transaction; returns whether
+    the event was queued (False on failure or without the outbox table)
+
+    durable is the DynamoDB put running alongside. The transaction commits
+    only once it succeeds: if it fails, the RDS row and event roll back, as
+    in the Flask app, so the client's retry does not create a second order.
+    """
+    if backends.db_pool is None:
+        return False
+    try:
+        async with backends.db_pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("""
+                    INSERT INTO orders (order_id, customer_id, store_id, total_amount, status, created_at)
+                    VALUES ($1, $2, $3, $4, $5, $6)
+                    ON CONFLICT (order_id) DO NOTHING
+                """, order['order_id'], order['customer_id'], order['store_id'],
+                    Decimal(str(order['total_amount'])), 'pending', datetime.utcnow())
+                if table_check.due():
+                    table_check.update(await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", OUTBOX_TABLE))
+                # Without the outbox table the caller publishes the event directly
+                if table_check.exists:
+                    await conn.execute(f"""
+                        INSERT INTO {OUTBOX_TABLE} (partition_key, payload) VALUES ($1, $2)
+                    """, str(order['customer_id'] or order['order_id']), dumps(order_created_event(order)))
+                await asyncio.shield(durable)
+        return table_check.exists
+    except Exception as e:
+        if durable.done() and not durable.cancelled() and durable.exception() is not None:
+            # Rolled back; the caller reports the DynamoDB error
+            return False
+        logger.error(f"RDS write error: {e}")
+        # Continue even if RDS fails
+        return False
+
+
+async def publish_order_event(order):
+    try:
+        await backends.kinesis.put_record(
+            StreamName=ORDER_EVENTS_STREAM,
+            Data=dumps(order_created_event(order)),
+            PartitionKey=order['customer_id'] or order['order_id']
+        )
+    except Exception as e:
+        logger.error(f"Kinesis publish error: {e}")
+
+
+async def put_metrics(metric_data):
+    try:
+        await backends.cloudwatch.put_metric_data(
+            Namespace='CloudCafe/OrderService',
+            MetricData=metric_data
+        )
+    except Exception as e:
+        logger.error(f"CloudWatch metric error: {e}")
+
+
+async def cache_set(order_id, order):
+    if backends.redis is None:
+        return
+    try:
+        if order is None:
+            await backends.redis.set(f"order:{order_id}", MISSING, ex=ORDER_CACHE_NEGATIVE_TTL)
+        else:
+            await backends.redis.set(f"order:{order_id}", dumps(order), ex=ORDER_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Order cache write error: {e}")
+
+
+async def load_order(order_id):
+    """Read an order from DynamoDB, falling back to RDS"""
+    response = await backends.active_orders_table.get_item(Key={'order_id': order_id})
+    if 'Item' in response:
+        return normalize(response['Item'])
+
+    if backends.db_pool is None:
+        return None
+    row = await backends.db_pool.fetchrow("SELECT * FROM orders WHERE order_id = $1", order_id)
+    return normalize(dict(row)) if row else None
+
+
+async def health(request):
+    """Health check endpoint"""
+    pool = backends.db_pool
+    return OrjsonResponse({
+        'status': 'healthy',
+        'service': 'order-service',
+        'mode': 'asgi',
+        'timestamp': datetime.utcnow().isoformat(),
+        'db_pool': {
+            'size': pool.get_size() if pool else 0,
+            'idle': pool.get_idle_size() if pool else 0,
+        },
+        'background_tasks': len(backends.background),
+        'active_board': backends.active_board.stats(),
+        'idempotency': backends.idempotency.stats(),
+        'order_stream': backends.events.stats() if backends.events else None
+    })
+
+
+async def create_order(request):
+    """Create a new order, at most once per Idempotency-Key"""
+    key = request.headers.get('Idempotency-Key')
+    if key is None:
+        content, status_code = await _create_order(request)
+        return OrjsonResponse(content, status_code=status_code)
+
+    # The store waits on in-flight duplicates, so it runs off the event loop
+    try:
+        claim = await asyncio.to_thread(backends.idempotency.claim, key, await request.body())
+    except IdempotencyError as e:
+        return OrjsonResponse({'error': str(e)}, status_code=e.status_code)
+
+    if claim is not None and claim.response is not None:
+        content, status_code = claim.response
+        return OrjsonResponse(content, status_code=status_code, headers={'Idempotent-Replayed': 'true'})
+
+    content, status_code = await _create_order(request)
+    await asyncio.to_thread(backends.idempotency.complete, claim, content, status_code)
+    return OrjsonResponse(content, status_code=status_code)
+
+
+async def _create_order(request):
+    """Returns (response body, status code)"""
+    start_time = time.time()
+
+    try:
+        data = await request.json()
+        try:
+            order = build_order(data, backends.price_index)
+        except InvalidItemError as e:
+            return {'error': str(e)}, 400
+        except PricesUnavailableError as e:
+            return {'error': str(e)}, 503
+
+        # DynamoDB and RDS writes run together; RDS waits for DynamoDB to commit
+        put = asyncio.ensure_future(backends.active_orders_table.put_item(Item=to_dynamodb(order)))
+        event_queued = await insert_order_rds(order, put)
+        await put
+
+        await cache_set(order['order_id'], order)
+        # Also fans the new order out to the store's dashboard streams
+        await asyncio.to_thread(backends.active_board.upsert, order)
+
+        # The outbox relay publishes the event; without the outbox row it is
+        # published directly, off the request path
+        if not event_queued:
+            backends.spawn(publish_order_event(order))
+        duration = time.time() - start_time
+        backends.spawn(put_metrics([
+            {
+                'MetricName': 'OrderCreationDuration',
+                'Value': duration * 1000,  # milliseconds
+                'Unit': 'Milliseconds',
+                'Timestamp': datetime.utcnow()
+            },
+            {
+                'MetricName': 'OrdersCreated',
+                'Value': 1,
+                'Unit': 'Count',
+                'Timestamp': datetime.utcnow()
+            }
+        ]))
+
+        return {
+            'order_id': order['order_id'],
+            'status': 'pending',
+            'total_amount': order['total_amount'],
+            'created_at': order['created_at']
+        }, 201
+
+    except Exception as e:
+        logger.error(f"Order creation error: {e}")
+        backends.spawn(put_metrics([{
+            'MetricName': 'OrderCreationErrors',
+            'Value': 1,
+            'Unit': 'Count',
+            'Timestamp': datetime.utcnow()
+        }]))
+        return {'error': str(e)}, 500
+
+
+async def get_order(request):
+    """Get order by ID"""
+    order_id = request.path_params['order_id']
+
+    try:
+        cached = None
+        if backends.redis is not None:
+            try:
+                cached = await backends.redis.get(f"order:{order_id}")
+            except Exception as e:
+                logger.warning(f"Order cache unavailable, reading backend: {e}")
+
+        if cached == MISSING:
+            order = None
+        elif cached is not None:
+            order = loads(cached)
+        else:
+            # Concurrent misses for the same order share one backend read
+            future = backends.inflight.get(order_id)
+            if future is None:
+                future = asyncio.ensure_future(load_order(order_id))
+                backends.inflight[order_id] = future
+                future.add_done_callback(lambda _: backends.inflight.pop(order_id, None))
+                order = await future
+                await cache_set(order_id, order)
+            else:
+                order = await asyncio.shield(future)
+
+        if order:
+            return OrjsonResponse(order)
+        return OrjsonResponse({'error': 'Order not found'}, status_code=404)
+
+    except Exception as e:
+        logger.error(f"Get order error: {e}")
+        return OrjsonResponse({'error': str(e)}, status_code=500)
+
+
+async def get_active_orders(request):
+    """Get a store's active orders, oldest first"""
+    store_id = request.query_params.get('store_id')
+    if not store_id:
+        return OrjsonResponse({'error': 'store_id is required'}, status_code=400)
+
+    if not backends.active_board.enabled:
+        return OrjsonResponse({'error': 'Active order board unavailable'}, status_code=503)
+    try:
+        orders = await asyncio.to_thread(backends.active_board.active_orders, store_id)
+    except redis.RedisError as e:
+        logger.error(f"Active order board error: {e}")
+        return OrjsonResponse({'error': str(e)}, status_code=503)
+    return OrjsonResponse({'store_id': store_id, 'orders': orders, 'count': len(orders)})
+
+
+async def order_stream(request):
+    """Server-sent events of a store's order changes"""
+    store_id = request.query_params.get('store_id')
+    if not store_id:
+        return OrjsonResponse({'error': 'store_id is required'}, status_code=400)
+
+    if backends.events is None:
+        return OrjsonResponse({'error': 'Order stream unavailable'}, status_code=503)
+
+    async def stream():
+        # Subscribing here, not before the response starts, means a client
+        # that leaves before the first byte never holds a listener
+        queue = None
+        try:
+            # Subscribe before reading the snapshot so no change falls in
+            # between; a change seen in both is harmless as events are
+            # idempotent upserts
+            queue = await backends.events.subscribe(store_id)
+            try:
+                orders = await asyncio.to_thread(backends.active_board.active_orders, store_id)
+            except redis.RedisError as e:
+                logger.error(f"Active order board error: {e}")
+                orders = []
+            yield f"event: snapshot\ndata: {dumps({'store_id': store_id, 'orders': orders})}\n\n"
+
+            while True:
+                try:
+                    data = await asyncio.wait_for(queue.get(), ORDER_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # Keeps idle connections open through the load balancer
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {data}\n\n"
+        finally:
+            if queue is not None:
+                backends.events.unsubscribe(store_id, queue)
+
+    return StreamingResponse(stream(), media_type='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    await backends.open()
+    try:
+        yield
+    finally:
+        await backends.close()
+
+
+app = Starlette(
+    routes=[
+        Route('/health', health, methods=['GET']),
+        Route('/orders', create_order, methods=['POST']),
+        Route('/orders/active', get_active_orders, methods=['GET']),
+        Route('/orders/stream', order_stream, methods=['GET']),
+        Route('/orders/{order_id}', get_order, methods=['GET']),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,137 @@
+"""
+Per-store active-order board in Redis
+
+Each store has a sorted set of its active orders scored by created_at, and
+a hash with the order summaries the barista dashboard renders:
+
+    store:<store_id>:active          zset  order_id -> created_at
+    store:<store_id>:active:orders   hash  order_id -> order summary JSON
+
+Orders are added on create, rewritten on every status change and removed
+on completion. Every write also publishes the change on the store's event
+channel (events.py), in the same round trip, for the dashboard stream.
+Entries older than the 24 h DynamoDB TTL are trimmed on every write and
+ignored on read. Reading the board is one Lua call: an O(log n) range over
+the sorted set plus HMGET of the same ids.
+"""
+
+import time
+import logging
+
+import redis
+
+from cache import normalize
+from events import channel
+from serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_TTL_SECONDS = 86400  # matches the DynamoDB item TTL
+ACTIVE_STATUSES = ('pending', 'preparing', 'ready')
+
+SUMMARY_FIELDS = ('order_id', 'customer_id', 'store_id', 'items', 'total_amount', 'status', 'created_at')
+
+# KEYS: zset, hash  ARGV: order_id, created_at, summary, cutoff, ttl, channel, event
+_UPSERT = """
+redis.call('zadd', KEYS[1], ARGV[2], ARGV[1])
+redis.call('hset', KEYS[2], ARGV[1], ARGV[3])
+local expired = redis.call('zrangebyscore', KEYS[1], '-inf', '(' .. ARGV[4], 'LIMIT', 0, 1000)
+if #expired > 0 then
+    redis.call('zrem', KEYS[1], unpack(expired))
+    redis.call('hdel', KEYS[2], unpack(expired))
+end
+redis.call('expire', KEYS[1], ARGV[5])
+redis.call('expire', KEYS[2], ARGV[5])
+redis.call('publish', ARGV[6], ARGV[7])
+return 1
+"""
+
+# KEYS: zset, hash  ARGV: cutoff, limit
+_RANGE = """
+local ids = redis.call('zrangebyscore', KEYS[1], ARGV[1], '+inf', 'LIMIT', 0, ARGV[2])
+if #ids == 0 then
+    return {}
+end
+return redis.call('hmget', KEYS[2], unpack(ids))
+"""
+
+
+class ActiveOrderBoard:
+    """Redis sorted-set board of each store's active orders"""
+
+    def __init__(self, client):
+        self.client = client
+        self._upsert = client.register_script(_UPSERT) if client else None
+        self._range = client.register_script(_RANGE) if client else None
+        self.counters = {'writes': 0, 'reads': 0, 'errors': 0}
+
+    @property
+    def enabled(self):
+        return self.client is not None
+
+    @staticmethod
+    def _keys(store_id):
+        return [f"store:{store_id}:active", f"store:{store_id}:active:orders"]
+
+    @staticmethod
+    def _upsert_args(order, cutoff):
+        summary = normalize({field: order.get(field) for field in SUMMARY_FIELDS})
+        event = dumps({'type': 'upsert', 'order': summary})
+        return [order['order_id'], order['created_at'], dumps(summary), cutoff,
+                ACTIVE_TTL_SECONDS, channel(order['store_id']), event]
+
+    def upsert(self, order):
+        """Add an order or record its new status; completed orders are removed"""
+        if self.client is None:
+            return
+        if order['status'] not in ACTIVE_STATUSES:
+            return self.remove(order['store_id'], order['order_id'])
+
+        try:
+            self._upsert(
+                keys=self._keys(order['store_id']),
+                args=self._upsert_args(order, int(time.time()) - ACTIVE_TTL_SECONDS)
+            )
+            self.counters['writes'] += 1
+        except redis.RedisError as e:
+            self.counters['errors'] += 1
+            logger.warning(f"Active order board write error: {e}")
+
+    def upsert_many(self, orders):
+        if self.client is None or not orders:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        cutoff = int(time.time()) - ACTIVE_TTL_SECONDS
+        for order in orders:
+            self._upsert(keys=self._keys(order['store_id']), args=self._upsert_args(order, cutoff), client=pipe)
+        try:
+            pipe.execute()
+            self.counters['writes'] += len(orders)
+        except redis.RedisError as e:
+            self.counters['errors'] += 1
+            logger.warning(f"Active order board write error: {e}")
+
+    def remove(self, store_id, order_id):
+        if self.client is None:
+            return
+        zset, orders = self._keys(store_id)
+        try:
+            pipe = self.client.pipeline(transaction=True)
+            pipe.zrem(zset, order_id)
+            pipe.hdel(orders, order_id)
+            pipe.publish(channel(store_id), dumps({'type': 'remove', 'order_id': order_id}))
+            pipe.execute()
+            self.counters['writes'] += 1
+        except redis.RedisError as e:
+            self.counters['errors'] += 1
+            logger.warning(f"Active order board write error: {e}")
+
+    def active_orders(self, store_id, limit=500):
+        """Return the store's active orders, oldest first (queue order)"""
+        cutoff = int(time.time()) - ACTIVE_TTL_SECONDS
+        raw = self._range(keys=self._keys(store_id), args=[cutoff, limit])
+        self.counters['reads'] += 1
+        return [loads(summary) for summary in raw if summary is not None]
+
+    def stats(self):
+        return dict(self.counters, enabled=self.enabled)
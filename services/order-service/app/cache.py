@@ -0,0 +1,230 @@
+"""
+Redis read-through cache for orders
+
+Sits in front of DynamoDB/RDS for GET /orders/<order_id>. Unknown order IDs
+are cached as a short-lived tombstone, and concurrent misses for the same
+order are collapsed behind a Redis lock so a burst of polls costs a single
+backend read. Redis failures never fail a request - the cache just steps
+aside and the backend is read directly.
+"""
+
+import os
+import time
+import uuid
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+
+import redis
+
+from serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+MISSING = '__missing__'
+
+# Delete the lock only if we still own it
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def normalize(value):
+    """Convert DynamoDB Decimals and RDS datetimes into plain JSON types"""
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [normalize(v) for v in value]
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class OrderCache:
+    """Read-through / write-through order cache on the ElastiCache client"""
+
+    def __init__(self, client, ttl=60, negative_ttl=5, lock_ttl_ms=2000, lock_wait=1.0):
+        self.client = client
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lock_ttl_ms = lock_ttl_ms
+        self.lock_wait = lock_wait
+        self._release_lock = client.register_script(_RELEASE_LOCK) if client else None
+
+        self.counters = {
+            'hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'loads': 0,
+            'errors': 0,
+        }
+
+    @staticmethod
+    def _key(order_id):
+        return f"order:{order_id}"
+
+    def _read(self, key):
+        """Return (found, order) from Redis"""
+        raw = self.client.get(key)
+        if raw is None:
+            return False, None
+        if raw == MISSING:
+            self.counters['negative_hits'] += 1
+            return True, None
+        self.counters['hits'] += 1
+        return True, loads(raw)
+
+    def _write(self, key, order):
+        if order is None:
+            self.client.set(key, MISSING, ex=self.negative_ttl)
+        else:
+            self.client.set(key, dumps(order), ex=self.ttl)
+
+    def get_or_load(self, order_id, loader):
+        """
+        Return the order for order_id, calling loader() on a cache miss
+
+        loader must return the order as a dict, or None if it does not exist.
+        """
+        if self.client is None:
+            return normalize(loader())
+
+        key = self._key(order_id)
+        try:
+            found, order = self._read(key)
+            if found:
+                return order
+            self.counters['misses'] += 1
+
+            # Stampede protection: only the lock holder reads the backend
+            token = uuid.uuid4().hex
+            lock_key = f"{key}:lock"
+            if not self.client.set(lock_key, token, nx=True, px=self.lock_ttl_ms):
+                deadline = time.monotonic() + self.lock_wait
+                while time.monotonic() < deadline:
+                    time.sleep(0.02)
+                    found, order = self._read(key)
+                    if found:
+                        self.counters['coalesced'] += 1
+                        return order
+                # Lock holder is slow or gone - read the backend ourselves
+                return self._load(key, loader)
+
+            try:
+                return self._load(key, loader)
+            finally:
+                try:
+                    self._release_lock(keys=[lock_key], args=[token])
+                except redis.RedisError:
+                    pass  # Expires on its own after lock_ttl_ms
+
+        except redis.RedisError as e:
+            self.counters['errors'] += 1
+            logger.warning(f"Order cache unavailable, reading backend: {e}")
+            return normalize(loader())
+
+    def _load(self, key, loader):
+        self.counters['loads'] += 1
+        order = normalize(loader())
+        try:
+            self._write(key, order)
+        except redis.RedisError as e:
+            self.counters['errors'] += 1
+            logger.warning(f"Order cache write error: {e}")
+        return order
+
+    def get_many(self, order_ids, loader):
+        """
+        Return {order_id: order or None} for order_ids, calling
+        loader(missed_ids) once for all cache misses
+
+        loader must return {order_id: order} for the orders it found. Misses
+        are not coalesced across requests as in get_or_load; a multi-get
+        reads each backend once per request already.
+        """
+        if self.client is None:
+            return self._load_many(order_ids, loader, cache=False)
+
+        try:
+            raw = self.client.mget([self._key(order_id) for order_id in order_ids])
+        except redis.RedisError as e:
+            self.counters['errors'] += 1
+            logger.warning(f"Order cache unavailable, reading backend: {e}")
+            return self._load_many(order_ids, loader, cache=False)
+
+        orders = {}
+        missed = []
+        for order_id, value in zip(order_ids, raw):
+            if value is None:
+                missed.append(order_id)
+            elif value == MISSING:
+                self.counters['negative_hits'] += 1
+                orders[order_id] = None
+            else:
+                self.counters['hits'] += 1
+                orders[order_id] = loads(value)
+        self.counters['misses'] += len(missed)
+
+        if missed:
+            orders.update(self._load_many(missed, loader, cache=True))
+        return orders
+
+    def _load_many(self, order_ids, loader, cache):
+        self.counters['loads'] += 1
+        found = loader(order_ids)
+        orders = {order_id: normalize(found.get(order_id)) for order_id in order_ids}
+        if cache:
+            try:
+                pipe = self.client.pipeline(transaction=False)
+                for order_id, order in orders.items():
+                    if order is None:
+                        pipe.set(self._key(order_id), MISSING, ex=self.negative_ttl)
+                    else:
+                        pipe.set(self._key(order_id), dumps(order), ex=self.ttl)
+                pipe.execute()
+            except redis.RedisError as e:
+                self.counters['errors'] += 1
+                logger.warning(f"Order cache write error: {e}")
+        return orders
+
+    def set(self, order):
+        """Write-through after a successful create"""
+        if self.client is None:
+            return
+        try:
+            self._write(self._key(order['order_id']), normalize(order))
+        except redis.RedisError as e:
+            self.counters['errors'] += 1
+            logger.warning(f"Order cache write error: {e}")
+
+    def set_many(self, orders):
+        """Write-through for a batch of new orders in one round trip"""
+        if self.client is None or not orders:
+            return
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for order in orders:
+                pipe.set(self._key(order['order_id']), dumps(normalize(order)), ex=self.ttl)
+            pipe.execute()
+        except redis.RedisError as e:
+            self.counters['errors'] += 1
+            logger.warning(f"Order cache write error: {e}")
+
+    def stats(self):
+        return dict(self.counters, enabled=self.client is not None)
+
+
+def build_order_cache(client):
+    return OrderCache(
+        client,
+        ttl=int(os.environ.get('ORDER_CACHE_TTL', 60)),
+        negative_ttl=int(os.environ.get('ORDER_CACHE_NEGATIVE_TTL', 5)),
+        lock_ttl_ms=int(os.environ.get('ORDER_CACHE_LOCK_TTL_MS', 2000)),
+        lock_wait=float(os.environ.get('ORDER_CACHE_LOCK_WAIT', 1.0)),
+    )
@@ -0,0 +1,162 @@
+"""
+Per-process AWS and Redis clients for the order service
+
+Nothing here is created at import. Each client is built on first use and
+then shared by every thread of the process; a forked process builds its
+own. That keeps importing main.py cheap and fork-safe, so gunicorn can
+import the app once in the master (preload_app) and fork ready workers.
+Modules hold Lazy stand-ins, which behave like the client they wrap.
+
+warm_up() runs in each worker before it accepts requests (gunicorn
+post_worker_init): it builds the clients, resolves credentials and service
+endpoints, opens the AWS connections and the initial database pool
+connections, so the first orders after a scale-out do not pay for it.
+"""
+
+import os
+import time
+import socket
+import logging
+import threading
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+ACTIVE_ORDERS_TABLE = os.environ.get('DYNAMODB_ACTIVE_ORDERS_TABLE', 'cloudcafe-active-orders-dev')
+
+_lock = threading.RLock()
+_instances = {}  # (pid or None, name) -> client
+_on_create = []
+
+
+def _get(name, factory, per_process=True):
+    key = (os.getpid() if per_process else None, name)
+    instance = _instances.get(key)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(key)
+            if instance is None:
+                instance = _instances[key] = factory()
+    return instance
+
+
+def use(name, instance, per_process=True):
+    """
+    Make instance this process's client called name, e.g. a local fake in
+    benchmarks. Names are 'client:<service>', 'table:<table name>',
+    'resource:dynamodb' and 'redis' (per_process=False).
+    """
+    with _lock:
+        _instances[(os.getpid() if per_process else None, name)] = instance
+
+
+def on_client_created(hook):
+    """Call hook(client) for every botocore client built from now on"""
+    _on_create.append(hook)
+
+
+def _session():
+    # boto3 is only imported when the first client is needed
+    import boto3
+    return _get('session', lambda: boto3.session.Session(region_name=AWS_REGION))
+
+
+def _created(client):
+    for hook in _on_create:
+        hook(client)
+    return client
+
+
+def aws_client(service):
+    return _get(f"client:{service}", lambda: _created(_session().client(service)))
+
+
+def dynamodb():
+    def create():
+        resource = _session().resource('dynamodb')
+        _created(resource.meta.client)
+        return resource
+    return _get('resource:dynamodb', create)
+
+
+def dynamodb_table(name):
+    return _get(f"table:{name}", lambda: dynamodb().Table(name))
+
+
+def redis_client():
+    """The process's Redis client, or None when REDIS_HOST is not set"""
+    if not os.environ.get('REDIS_HOST'):
+        return None
+
+    def create():
+        import redis
+        return redis.Redis(
+            host=os.environ.get('REDIS_HOST'),
+            port=int(os.environ.get('REDIS_PORT', 6379)),
+            decode_responses=True,
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5
+        )
+    # redis-py drops inherited connections itself after a fork, so one
+    # client object is safe to share with forked workers
+    return _get('redis', create, per_process=False)
+
+
+class Lazy:
+    """Stands in for the object factory() returns, created on first use"""
+
+    def __init__(self, factory):
+        self._factory = factory
+
+    def __getattr__(self, name):
+        return getattr(self._factory(), name)
+
+
+def _resolve(host, port):
+    socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+
+
+def warm_up():
+    """Open this process's clients and connections; returns step timings in ms"""
+    timings = {}
+
+    def step(name, fn):
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            logger.warning(f"Warm-up step {name} failed: {e}")
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    def aws():
+        # Credentials come from the ECS task role endpoint on first use
+        _session().get_credentials().get_frozen_credentials()
+        for service in ('kinesis', 'cloudwatch'):
+            client = aws_client(service)
+            _resolve(urlparse(client.meta.endpoint_url).hostname, 443)
+
+    def dynamo():
+        # A point read of a key that does not exist: opens the TLS
+        # connection and resolves the GetItem endpoint rules
+        dynamodb_table(ACTIVE_ORDERS_TABLE).get_item(Key={'order_id': '__warm_up__'})
+
+    def rds():
+        if not os.environ.get('DB_HOST'):
+            return
+        import db
+        db.get_pool().prefill()
+        if db.has_reader():
+            db.get_pool('reader').prefill()
+
+    def cache():
+        client = redis_client()
+        if client is not None:
+            client.ping()
+
+    step('aws_clients', aws)
+    step('dynamodb', dynamo)
+    step('rds_pool', rds)
+    step('redis', cache)
+    logger.info(f"Warm-up finished in {sum(timings.values()):.0f} ms: {timings}")
+    return timings
@@ -0,0 +1,333 @@
+"""
+PostgreSQL connection pooling for the order service
+
+Each gunicorn worker keeps its own small pool of Aurora connections instead
+of opening a new connection (TCP handshake, auth, backend fork) per request.
+Connections are health-checked on checkout when they have been idle for a
+while, and dropped and re-opened after a failover.
+
+Writes use the cluster (writer) endpoint, DB_HOST. Read-only paths can go
+to the Aurora reader endpoint, DB_READER_HOST, through a pool of their
+own, so order lookups and listings do not compete with inserts for the
+writer. A key (order ID, store ID) this process wrote within
+DB_READ_AFTER_WRITE_WINDOW seconds is read from the writer instead, so a
+client does not read its own write back stale from a lagging replica.
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the checkout timeout"""
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of psycopg2 connections
+
+    The pool is bound to the process that created it. After a fork (gunicorn
+    workers) the child must not reuse the parent's sockets, so get_pool()
+    builds a fresh pool per PID.
+    """
+
+    def __init__(self, minconn=1, maxconn=5, timeout=5.0, healthcheck_interval=30.0, **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.healthcheck_interval = healthcheck_interval
+        self.connect_kwargs = connect_kwargs
+        self.pid = os.getpid()
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._idle = []  # (connection, last_used) - LIFO keeps hot connections hot
+        self._in_use = 0
+
+        self.counters = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_ms_total': 0.0,
+            'wait_time_ms_max': 0.0,
+            'timeouts': 0,
+            'saturated': 0,
+            'connections_opened': 0,
+            'connections_discarded': 0,
+            'healthcheck_failures': 0,
+            'reconnects': 0,
+        }
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.connect_kwargs)
+        with self._lock:
+            self.counters['connections_opened'] += 1
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self.counters['connections_discarded'] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn, last_used):
+        if conn.closed:
+            return False
+        if time.time() - last_used < self.healthcheck_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            with self._lock:
+                self.counters['healthcheck_failures'] += 1
+            return False
+
+    def _purge_idle(self):
+        """Drop every idle connection, e.g. after the writer failed over"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def prefill(self):
+        """Open minconn connections up front"""
+        while True:
+            with self._lock:
+                if len(self._idle) + self._in_use >= self.minconn:
+                    return
+            conn = self._connect()
+            with self._lock:
+                self._idle.append((conn, time.time()))
+
+    def getconn(self):
+        wait_start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.counters['saturated'] += 1
+                self.counters['waits'] += 1
+            if not self._slots.acquire(timeout=self.timeout):
+                with self._lock:
+                    self.counters['timeouts'] += 1
+                raise PoolTimeout(f"No database connection available after {self.timeout}s (pool size {self.maxconn})")
+        wait_ms = (time.perf_counter() - wait_start) * 1000
+
+        with self._lock:
+            self._in_use += 1
+            self.counters['checkouts'] += 1
+            self.counters['wait_time_ms_total'] += wait_ms
+            self.counters['wait_time_ms_max'] = max(self.counters['wait_time_ms_max'], wait_ms)
+
+        try:
+            while True:
+                with self._lock:
+                    entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    return self._connect()
+                conn, last_used = entry
+                if self._is_healthy(conn, last_used):
+                    return conn
+                self._discard(conn)
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, broken=False):
+        if broken or conn.closed:
+            self._discard(conn)
+        else:
+            try:
+                # Never hand out a connection with an open transaction
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                with self._lock:
+                    self._idle.append((conn, time.time()))
+            except psycopg2.Error:
+                self._discard(conn)
+        with self._lock:
+            self._in_use -= 1
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection for the duration of a with-block
+
+        Connection-level errors (server gone, failover) discard the
+        connection and every idle sibling, so the next checkout reconnects.
+        """
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            with self._lock:
+                self.counters['reconnects'] += 1
+            self._purge_idle()
+            raise
+        finally:
+            self.putconn(conn, broken=broken)
+
+    def closeall(self):
+        self._purge_idle()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats.update({
+                'size': self.maxconn,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+            })
+        checkouts = stats['checkouts'] or 1
+        stats['wait_time_ms_avg'] = stats['wait_time_ms_total'] / checkouts
+        return stats
+
+
+# Pools by target ('writer', 'reader'), bound to the creating process
+_pools = {}
+_pool_lock = threading.Lock()
+# Pools inherited from a parent process. Kept referenced so garbage
+# collection never closes (and terminates) the parent's server sessions.
+_inherited_pools = []
+
+
+def _build_pool(target):
+    prefix = 'DB_READER_' if target == 'reader' else 'DB_'
+    return ConnectionPool(
+        minconn=int(os.environ.get(f'{prefix}POOL_MIN', os.environ.get('DB_POOL_MIN', 1))),
+        maxconn=int(os.environ.get(f'{prefix}POOL_MAX', os.environ.get('DB_POOL_MAX', 5))),
+        timeout=float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+        healthcheck_interval=float(os.environ.get('DB_POOL_HEALTHCHECK_INTERVAL', 30)),
+        host=os.environ.get(f'{prefix}HOST'),
+        port=int(os.environ.get('DB_PORT', 5432)),
+        database=os.environ.get('DB_NAME', 'cloudcafe'),
+        user=os.environ.get('DB_USER'),
+        password=os.environ.get('DB_PASSWORD'),
+        connect_timeout=int(os.environ.get('DB_CONNECT_TIMEOUT', 3)),
+        # Detect a dead writer quickly after an Aurora failover
+        keepalives=1,
+        keepalives_idle=30,
+        keepalives_interval=10,
+        keepalives_count=3,
+    )
+
+
+def get_pool(target='writer'):
+    """Return this process's pool for target, creating it on first use"""
+    pool = _pools.get(target)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+
+    with _pool_lock:
+        pool = _pools.get(target)
+        if pool is not None and pool.pid != os.getpid():
+            _inherited_pools.append(pool)
+            pool = None
+        if pool is None:
+            pool = _pools[target] = _build_pool(target)
+        return pool
+
+
+def has_reader():
+    """Whether a reader endpoint (DB_READER_HOST) is configured"""
+    return bool(os.environ.get('DB_READER_HOST')) or 'reader' in _pools
+
+
+def set_pool(pool, target='writer'):
+    """Use pool as this process's pool for target, e.g. a stub in benchmarks"""
+    with _pool_lock:
+        _pools[target] = pool
+
+
+def reset_pool():
+    """Forget the current pools without touching their sockets (post-fork hook)"""
+    with _pool_lock:
+        _inherited_pools.extend(_pools.values())
+        _pools.clear()
+        _recent_writes.clear()
+
+
+class RecentWrites:
+    """
+    Keys (order IDs, store IDs) written by this process in the last window
+    seconds, whose reads should go to the writer rather than a lagging
+    replica. Other processes do not see them; reads there stay on the
+    reader, which Aurora typically brings up to date within tens of ms.
+    """
+
+    def __init__(self, window=1.0, max_keys=10000):
+        self.window = window
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._written = {}  # key -> monotonic time of the last write
+
+    def note(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                # Re-insert so the dict stays ordered oldest write first
+                self._written.pop(key, None)
+                self._written[key] = now
+            self._expire(now)
+
+    def _expire(self, now):
+        cutoff = now - self.window
+        while self._written:
+            key, written_at = next(iter(self._written.items()))
+            if written_at >= cutoff and len(self._written) <= self.max_keys:
+                break
+            del self._written[key]
+
+    def recent(self, keys):
+        if self.window <= 0:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            return any(now - self._written.get(key, float('-inf')) < self.window for key in keys)
+
+    def clear(self):
+        with self._lock:
+            self._written.clear()
+
+
+_recent_writes = RecentWrites(window=float(os.environ.get('DB_READ_AFTER_WRITE_WINDOW', 2.0)))
+
+# Reads per target: reader, writer because no reader is configured, and
+# writer because a key was written within the read-after-write window
+routing = {'reader': 0, 'writer_no_reader': 0, 'writer_after_write': 0}
+
+
+def note_write(*keys):
+    """Record that keys were just written, so reads of them stay on the writer"""
+    _recent_writes.note(str(key) for key in keys if key is not None)
+
+
+def read_pool(*keys):
+    """
+    The pool for a read of keys: the reader, unless none is configured or
+    one of the keys was written by this process within the
+    read-after-write window
+    """
+    if not has_reader():
+        routing['writer_no_reader'] += 1
+        return get_pool()
+    if _recent_writes.recent(str(key) for key in keys if key is not None):
+        routing['writer_after_write'] += 1
+        return get_pool()
+    routing['reader'] += 1
+    return get_pool('reader')
+
+
+def routing_stats():
+    return dict(routing, read_after_write_window=_recent_writes.window, reader_configured=has_reader())
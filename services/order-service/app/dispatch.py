@@ -0,0 +1,149 @@
+"""
+Background dispatch stage for the order service
+
+Side effects that do not have to be durable before we answer the client
+(Kinesis events, CloudWatch metrics) are queued here and executed by a
+worker thread, so POST /orders only waits for the DynamoDB and RDS writes.
+
+The queue is bounded. When it is full, submit() blocks for at most
+DISPATCH_ENQUEUE_TIMEOUT seconds (backpressure) and then sheds the task,
+counting it as dropped. The queue is drained on worker shutdown.
+"""
+
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class Dispatcher:
+    """Bounded in-memory queue drained by a single daemon thread"""
+
+    def __init__(self, maxsize=1000, enqueue_timeout=0.005):
+        self.enqueue_timeout = enqueue_timeout
+        self.pid = os.getpid()
+
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+        self.counters = {
+            'enqueued': 0,
+            'processed': 0,
+            'failed': 0,
+            'dropped': 0,
+            'backpressure_waits': 0,
+            'queue_high_watermark': 0,
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='order-dispatch', daemon=True)
+                self._thread.start()
+
+    def submit(self, name, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs); returns False if the task was shed"""
+        if self._closed:
+            self.counters['dropped'] += 1
+            return False
+        self._ensure_started()
+
+        task = (name, fn, args, kwargs)
+        try:
+            self._queue.put_nowait(task)
+        except queue.Full:
+            self.counters['backpressure_waits'] += 1
+            try:
+                self._queue.put(task, timeout=self.enqueue_timeout)
+            except queue.Full:
+                self.counters['dropped'] += 1
+                logger.warning(f"Dispatch queue full, dropping {name} task")
+                return False
+
+        self.counters['enqueued'] += 1
+        depth = self._queue.qsize()
+        if depth > self.counters['queue_high_watermark']:
+            self.counters['queue_high_watermark'] = depth
+        return True
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task is _STOP:
+                    return
+                name, fn, args, kwargs = task
+                try:
+                    fn(*args, **kwargs)
+                    self.counters['processed'] += 1
+                except Exception as e:
+                    self.counters['failed'] += 1
+                    logger.error(f"Dispatch {name} error: {e}")
+            finally:
+                self._queue.task_done()
+
+    def shutdown(self, timeout=5.0):
+        """Stop accepting tasks and drain what is already queued"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is None:
+            return
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                self._queue.put(_STOP, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+        if self._thread.is_alive():
+            logger.warning(f"Dispatch queue not drained on shutdown, {self._queue.qsize()} tasks lost")
+
+    def stats(self):
+        return dict(self.counters, queue_depth=self._queue.qsize(), queue_size=self._queue.maxsize)
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """Return this process's dispatcher; threads do not survive fork"""
+    global _dispatcher
+    dispatcher = _dispatcher
+    if dispatcher is not None and dispatcher.pid == os.getpid():
+        return dispatcher
+
+    with _dispatcher_lock:
+        if _dispatcher is None or _dispatcher.pid != os.getpid():
+            _dispatcher = Dispatcher(
+                maxsize=int(os.environ.get('DISPATCH_QUEUE_SIZE', 1000)),
+                enqueue_timeout=float(os.environ.get('DISPATCH_ENQUEUE_TIMEOUT', 0.005)),
+            )
+        return _dispatcher
+
+
+def submit(name, fn, *args, **kwargs):
+    return get_dispatcher().submit(name, fn, *args, **kwargs)
+
+
+def shutdown(timeout=5.0):
+    """Flush the current process's dispatcher (gunicorn worker_exit / atexit)"""
+    dispatcher = _dispatcher
+    if dispatcher is not None and dispatcher.pid == os.getpid():
+        dispatcher.shutdown(timeout)
+
+
+atexit.register(shutdown)
@@ -0,0 +1,123 @@
+"""
+Per-store order event fan-out for the barista dashboard stream
+
+Every change to a store's active-order board is published on the Redis
+channel store:<store_id>:orders:events (see board.py). An ASGI worker holds
+a single pub/sub connection and subscribes to a store's channel only while
+at least one dashboard of that store is connected; each incoming message is
+copied to the in-memory queue of every local listener. A connected screen
+therefore costs one small queue, not a Redis connection or a worker.
+"""
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+CHANNEL_PREFIX = 'store:'
+CHANNEL_SUFFIX = ':orders:events'
+
+
+def channel(store_id):
+    return f"{CHANNEL_PREFIX}{store_id}{CHANNEL_SUFFIX}"
+
+
+def channel_store_id(name):
+    """The store_id of a channel(); store ids may contain ':'"""
+    return name[len(CHANNEL_PREFIX):-len(CHANNEL_SUFFIX)]
+
+
+class StoreEventHub:
+    """Fans Redis pub/sub messages out to per-connection asyncio queues"""
+
+    def __init__(self, client, queue_size=100):
+        self.client = client
+        self.queue_size = queue_size
+        self._listeners = {}  # store_id -> set of queues
+        self._pubsub = None
+        self._reader = None
+        self._lock = asyncio.Lock()
+        self.counters = {'delivered': 0, 'dropped': 0}
+
+    @property
+    def connections(self):
+        return sum(len(queues) for queues in self._listeners.values())
+
+    async def subscribe(self, store_id):
+        """Register a listener for a store and return its queue"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        async with self._lock:
+            if self._pubsub is None:
+                self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            queues = self._listeners.setdefault(store_id, set())
+            if not queues:
+                await self._pubsub.subscribe(channel(store_id))
+            queues.add(queue)
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read())
+        return queue
+
+    def unsubscribe(self, store_id, queue):
+        """Drop a listener; safe to call from a cancelled stream"""
+        queues = self._listeners.get(store_id)
+        if not queues:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._listeners[store_id]
+            asyncio.ensure_future(self._release(store_id))
+
+    async def _release(self, store_id):
+        async with self._lock:
+            # A new listener may have arrived in the meantime
+            if store_id in self._listeners:
+                return
+            try:
+                await self._pubsub.unsubscribe(channel(store_id))
+            except Exception as e:
+                logger.warning(f"Order event unsubscribe error: {e}")
+
+    async def _read(self):
+        while self._listeners:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except Exception as e:
+                logger.error(f"Order event stream error: {e}")
+                await asyncio.sleep(1.0)
+                await self._resubscribe()
+                continue
+            if message is None:
+                continue
+
+            store_id = channel_store_id(message['channel'])
+            for queue in list(self._listeners.get(store_id, ())):
+                try:
+                    queue.put_nowait(message['data'])
+                    self.counters['delivered'] += 1
+                except asyncio.QueueFull:
+                    # A stalled screen loses events; it resyncs from the
+                    # snapshot sent on reconnect
+                    self.counters['dropped'] += 1
+
+    async def _resubscribe(self):
+        async with self._lock:
+            try:
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+            self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                if self._listeners:
+                    await self._pubsub.subscribe(*(channel(store_id) for store_id in self._listeners))
+            except Exception as e:
+                logger.error(f"Order event resubscribe error: {e}")
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+
+    def stats(self):
+        return dict(self.counters, stores=len(self._listeners), connections=self.connections)
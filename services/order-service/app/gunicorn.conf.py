@@ -0,0 +1,67 @@
+"""
+Gunicorn configuration for the order service
+
+Loaded automatically from the working directory (/app in the container).
+"""
+
+import os
+import shutil
+
+# Workers write Prometheus samples here so /metrics can merge them. Must be
+# set before anything imports prometheus_client.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/order-service-metrics')
+# preload_app imports the app, which creates its sample files, before
+# on_starting runs
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+import db
+import dispatch
+import producer
+import status
+
+bind = '0.0.0.0:8080'
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+timeout = 120
+# Import the app once in the master; workers fork with it loaded. Safe
+# because importing it opens no clients or sockets (see clients.py).
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true') == 'true'
+
+
+def on_starting(server):
+    # Samples from a previous run would be merged into this one's
+    shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'])
+
+
+def post_fork(server, worker):
+    # Never share the parent's database sockets with a forked worker
+    db.reset_pool()
+
+
+def is_asgi_worker(worker):
+    # uvicorn workers serve asgi:app, which opens its own async clients in
+    # its lifespan and never touches clients.py
+    return type(worker).__module__.split('.')[0] == 'uvicorn'
+
+
+def post_worker_init(worker):
+    # Connect everything before this worker accepts its first request
+    if is_asgi_worker(worker):
+        return
+    import clients
+    clients.warm_up()
+
+
+def worker_exit(server, worker):
+    # Publish queued Kinesis events, RDS status updates and metrics before
+    # the worker goes away
+    timeout = float(os.environ.get('DISPATCH_SHUTDOWN_TIMEOUT', 10))
+    producer.shutdown(timeout=timeout)
+    status.shutdown(timeout=timeout)
+    dispatch.shutdown(timeout=timeout)
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges (pool connections)
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,162 @@
+"""
+Idempotency-Key support for POST /orders (Flask and ASGI apps)
+
+A request carrying an Idempotency-Key header first claims the key in Redis
+(SET NX on idempotency:<key>). The claim holder runs the request and
+replaces the claim with the response, kept for IDEMPOTENCY_TTL seconds, so
+a retry replays the original response without touching any backend.
+A duplicate that arrives while the first is still running waits for its
+response instead of creating a second order.
+
+Each record carries a hash of the request body; reusing a key with a
+different body is rejected. Server errors are not stored - the claim is
+released so the client's retry runs again. If Redis is unavailable the
+request runs without protection rather than failing.
+"""
+
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Replace or delete the record only while it still holds our claim
+_REPLACE_CLAIM = """
+if redis.call('get', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+if ARGV[2] == '' then
+    return redis.call('del', KEYS[1])
+end
+redis.call('set', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+
+class IdempotencyError(Exception):
+    """Raised when a keyed request cannot run; carries the HTTP status"""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class Claim:
+    """Outcome of claiming a key: run the request, or replay a response"""
+
+    def __init__(self, key, value=None, response=None):
+        self.key = key
+        self.value = value
+        self.response = response  # (body, status_code) of the original request
+
+
+class IdempotencyStore:
+    """Redis-backed idempotency records with in-flight claims"""
+
+    def __init__(self, client, ttl=3600, claim_ttl=30, wait=10.0):
+        self.client = client
+        self.ttl = ttl
+        self.claim_ttl = claim_ttl
+        self.wait = wait
+        self._replace_claim = client.register_script(_REPLACE_CLAIM) if client else None
+
+        self.counters = {
+            'claims': 0,
+            'replays': 0,
+            'waits': 0,
+            'conflicts': 0,
+            'errors': 0,
+        }
+
+    @staticmethod
+    def _key(key):
+        return f"idempotency:{key}"
+
+    def claim(self, key, body):
+        """
+        Claim key for a request with the given raw body
+
+        Returns a Claim; when claim.response is set the request already ran
+        and its response must be replayed. Returns None if Redis is down.
+        """
+        if self.client is None:
+            return None
+        if not key or len(key) > 255:
+            raise IdempotencyError('Idempotency-Key must be 1-255 characters', 400)
+
+        fingerprint = hashlib.sha256(body).hexdigest()
+        value = json.dumps({'state': 'in_progress', 'fingerprint': fingerprint, 'claim': uuid.uuid4().hex})
+        redis_key = self._key(key)
+        try:
+            if self.client.set(redis_key, value, nx=True, ex=self.claim_ttl):
+                self.counters['claims'] += 1
+                return Claim(redis_key, value=value)
+
+            deadline = time.monotonic() + self.wait
+            waited = False
+            while True:
+                raw = self.client.get(redis_key)
+                if raw is None:
+                    # The first request failed and released the key - take over
+                    if self.client.set(redis_key, value, nx=True, ex=self.claim_ttl):
+                        self.counters['claims'] += 1
+                        return Claim(redis_key, value=value)
+                    continue
+
+                record = json.loads(raw)
+                if record['fingerprint'] != fingerprint:
+                    self.counters['conflicts'] += 1
+                    raise IdempotencyError('Idempotency-Key was already used with a different request', 422)
+                if record['state'] == 'done':
+                    self.counters['replays'] += 1
+                    return Claim(redis_key, response=(record['body'], record['status_code']))
+
+                if not waited:
+                    waited = True
+                    self.counters['waits'] += 1
+                if time.monotonic() >= deadline:
+                    self.counters['conflicts'] += 1
+                    raise IdempotencyError('A request with this Idempotency-Key is still in progress', 409)
+                time.sleep(0.02)
+
+        except redis.RedisError as e:
+            self.counters['errors'] += 1
+            logger.warning(f"Idempotency store unavailable, running request unprotected: {e}")
+            return None
+
+    def complete(self, claim, body, status_code):
+        """Store the response for replay; server errors release the key instead"""
+        if claim is None or claim.value is None:
+            return
+        if status_code >= 500:
+            stored = ''
+        else:
+            record = json.loads(claim.value)
+            stored = json.dumps({
+                'state': 'done',
+                'fingerprint': record['fingerprint'],
+                'status_code': status_code,
+                'body': body,
+            })
+        try:
+            self._replace_claim(keys=[claim.key], args=[claim.value, stored, self.ttl])
+        except redis.RedisError as e:
+            self.counters['errors'] += 1
+            logger.warning(f"Idempotency record write error: {e}")
+
+    def stats(self):
+        return dict(self.counters, enabled=self.client is not None)
+
+
+def build_idempotency_store(client):
+    return IdempotencyStore(
+        client,
+        ttl=int(os.environ.get('IDEMPOTENCY_TTL', 3600)),
+        claim_ttl=int(os.environ.get('IDEMPOTENCY_CLAIM_TTL', 30)),
+        wait=float(os.environ.get('IDEMPOTENCY_WAIT', 10)),
+    )
@@ -0,0 +1,201 @@
+"""
+Stress job runner for the order service
+
+Stress scenarios run in their own process, so triggering one never ties up
+a gunicorn worker. State lives in a JSON file per job under STRESS_JOB_DIR,
+which lets any worker of the task answer status and cancel requests. A
+file lock held by the running job process allows one job per task; the
+lock goes away with the process, even if it is killed.
+
+The job process is started as:
+
+    python jobs.py run <job_id>
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import fcntl
+import signal
+import subprocess
+
+JOB_DIR = os.environ.get('STRESS_JOB_DIR', '/tmp/order-service-stress-jobs')
+LOCK_FILE = os.path.join(JOB_DIR, 'running.lock')
+
+# Job process writes progress at most this often
+PROGRESS_INTERVAL = 1.0
+
+ACTIVE_STATES = ('starting', 'running', 'cancelling')
+
+
+class JobConflict(Exception):
+    """Raised when a stress job is already running on this task"""
+
+    def __init__(self, job_id):
+        super().__init__(f"Stress job {job_id} is already running")
+        self.job_id = job_id
+
+
+def _job_path(job_id):
+    return os.path.join(JOB_DIR, f"{job_id}.json")
+
+
+def _write_job(job):
+    # Atomic replace so readers never see a half-written file
+    tmp = f"{_job_path(job['job_id'])}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(job, f)
+    os.replace(tmp, _job_path(job['job_id']))
+
+
+def _lock_is_held():
+    with open(LOCK_FILE, 'a+') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(f, fcntl.LOCK_UN)
+        return False
+
+
+def get_job(job_id):
+    """Return the job's state, or None if there is no such job"""
+    try:
+        with open(_job_path(job_id)) as f:
+            job = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    # A job process that died without recording it (OOM kill, SIGKILL)
+    # no longer holds the lock
+    if job['status'] in ACTIVE_STATES and not _lock_is_held():
+        job['status'] = 'failed'
+        job['error'] = 'job process exited unexpectedly'
+        job['finished_at'] = time.time()
+        _write_job(job)
+    return job
+
+
+def start_job(scenario, params):
+    """Start a stress job in a new process and return its initial state"""
+    os.makedirs(JOB_DIR, exist_ok=True)
+
+    lock = open(LOCK_FILE, 'a+')
+    try:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.seek(0)
+            raise JobConflict(lock.read().strip() or 'unknown')
+
+        job_id = uuid.uuid4().hex
+        lock.seek(0)
+        lock.truncate()
+        lock.write(job_id)
+        lock.flush()
+
+        job = {
+            'job_id': job_id,
+            'scenario': scenario,
+            'params': params,
+            'status': 'starting',
+            'pid': None,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'progress': {'iterations': 0, 'cpu_percent': None, 'elapsed_seconds': 0.0},
+            'result': None,
+            'error': None,
+        }
+        _write_job(job)
+
+        # The child inherits the locked file description, so the lock is
+        # held for exactly as long as the job process lives
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), 'run', job_id],
+            pass_fds=(lock.fileno(),),
+            start_new_session=True,
+        )
+        # The job process records its own pid and state from here on
+        return dict(job, pid=process.pid)
+    finally:
+        lock.close()
+
+
+def cancel_job(job_id):
+    """Ask a running job to stop; returns its state, or None if unknown"""
+    job = get_job(job_id)
+    if job is None or job['status'] not in ACTIVE_STATES:
+        return job
+    job['status'] = 'cancelling'
+    _write_job(job)
+    try:
+        os.kill(job['pid'], signal.SIGTERM)
+    except (ProcessLookupError, TypeError):
+        pass
+    return job
+
+
+def _run(job_id):
+    """Entry point of the job process"""
+    with open(_job_path(job_id)) as f:
+        job = json.load(f)
+
+    # Cancelled before the process got going
+    cancelled = job['status'] == 'cancelling'
+
+    def on_sigterm(signum, frame):
+        nonlocal cancelled
+        cancelled = True
+
+    signal.signal(signal.SIGTERM, on_sigterm)
+
+    job.update(status='running', pid=os.getpid(), started_at=time.time())
+    _write_job(job)
+
+    last_write = 0.0
+
+    def progress(iteration, cpu_percent, elapsed):
+        nonlocal last_write
+        job['progress'] = {
+            'iterations': iteration,
+            'cpu_percent': cpu_percent,
+            'elapsed_seconds': round(elapsed, 1),
+        }
+        now = time.monotonic()
+        if now - last_write >= PROGRESS_INTERVAL:
+            last_write = now
+            if not cancelled:
+                _write_job(job)
+
+    try:
+        if job['scenario'] != 'morning_rush':
+            raise ValueError(f"unknown scenario: {job['scenario']}")
+
+        from stress import MorningRushStress
+        from stress_profile import StressProfile
+        profile = job['params'].get('profile')
+        job['result'] = MorningRushStress().simulate(
+            duration_seconds=job['params']['duration_seconds'],
+            target_cpu=job['params']['target_cpu'],
+            progress=progress,
+            should_stop=lambda: cancelled,
+            workers=job['params'].get('workers', 1),
+            profile=StressProfile.from_dict(profile) if profile else None,
+        )
+        job['status'] = 'cancelled' if cancelled else 'completed'
+    except Exception as e:
+        job['status'] = 'failed'
+        job['error'] = str(e)
+    finally:
+        job['finished_at'] = time.time()
+        _write_job(job)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == 'run':
+        _run(sys.argv[2])
+    else:
+        sys.exit(f"usage: {sys.argv[0]} run <job_id>")
@@ -0,0 +1,171 @@
+"""
+Keyset-paginated order listings
+
+Orders are listed newest first for one store, optionally filtered by status
+and a created_at range (epoch seconds). Pages are addressed by an opaque
+cursor holding the position of the last row returned, so every page is a
+single index range read no matter how deep into the history it is:
+
+- store + status inside the 24 h active window: DynamoDB StoreStatusIndex
+  (hash store_status = "<store_id>#<status>", range created_at)
+- everything else: RDS, on idx_orders_store_created or
+  idx_orders_store_status_created with a (created_at, order_id) row
+  comparison
+
+The backend is chosen on the first page and recorded in the cursor, so a
+traversal never switches backends halfway. The cursor also records the
+store and filters it was issued for; later pages must repeat them.
+"""
+
+import json
+import time
+import base64
+from datetime import datetime
+
+from cache import normalize
+
+STORE_STATUS_INDEX = 'StoreStatusIndex'
+ACTIVE_WINDOW_SECONDS = 86400  # matches the DynamoDB item TTL
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+ORDER_STATUSES = ('pending', 'preparing', 'ready', 'completed', 'cancelled')
+
+
+class ListingError(ValueError):
+    """Raised for invalid listing parameters or cursors"""
+
+
+def store_status(store_id, status):
+    return f"{store_id}#{status}"
+
+
+def encode_cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ListingError('invalid cursor')
+    if not isinstance(position, dict) or position.get('source') not in ('dynamodb', 'rds'):
+        raise ListingError('invalid cursor')
+    return position
+
+
+def parse_params(args):
+    """Validate query-string arguments into a listing query"""
+    store_id = args.get('store_id')
+    if not store_id:
+        raise ListingError('store_id is required')
+
+    status = args.get('status')
+    if status is not None and status not in ORDER_STATUSES:
+        raise ListingError(f"status must be one of {', '.join(ORDER_STATUSES)}")
+
+    try:
+        since = int(args['since']) if args.get('since') else None
+        until = int(args['until']) if args.get('until') else None
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ListingError('since, until and limit must be integers')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ListingError(f'limit must be between 1 and {MAX_LIMIT}')
+
+    query = {
+        'store_id': str(store_id),
+        'status': status,
+        'since': since,
+        'until': until,
+        'limit': limit,
+        'cursor': None,
+    }
+    if args.get('cursor'):
+        cursor = decode_cursor(args['cursor'])
+        if cursor.get('query') != _filters(query):
+            raise ListingError('cursor was issued for a different store_id, status, since or until')
+        query['cursor'] = cursor
+    return query
+
+
+def _filters(query):
+    """The part of a query a cursor is tied to"""
+    return {field: query[field] for field in ('store_id', 'status', 'since', 'until')}
+
+
+def choose_source(query):
+    if query['cursor'] is not None:
+        return query['cursor']['source']
+    in_active_window = query['since'] is not None and query['since'] >= time.time() - ACTIVE_WINDOW_SECONDS
+    return 'dynamodb' if query['status'] and in_active_window else 'rds'
+
+
+def list_from_dynamodb(table, query):
+    # Deferred so importing the app does not pull in boto3
+    from boto3.dynamodb.conditions import Key
+
+    condition = Key('store_status').eq(store_status(query['store_id'], query['status']))
+    if query['until'] is not None:
+        condition = condition & Key('created_at').between(query['since'], query['until'] - 1)
+    else:
+        condition = condition & Key('created_at').gte(query['since'])
+
+    kwargs = {
+        'IndexName': STORE_STATUS_INDEX,
+        'KeyConditionExpression': condition,
+        'ScanIndexForward': False,
+        'Limit': query['limit'],
+    }
+    if query['cursor'] is not None:
+        kwargs['ExclusiveStartKey'] = query['cursor']['key']
+
+    response = table.query(**kwargs)
+    last_key = response.get('LastEvaluatedKey')
+    next_cursor = None
+    if last_key:
+        next_cursor = encode_cursor({'source': 'dynamodb', 'query': _filters(query), 'key': normalize(last_key)})
+    return response['Items'], next_cursor
+
+
+def list_from_rds(conn, cursor_factory, query):
+    where = ['store_id = %s']
+    params = [query['store_id']]
+    if query['status']:
+        where.append('status = %s')
+        params.append(query['status'])
+    if query['since'] is not None:
+        where.append('created_at >= %s')
+        params.append(datetime.utcfromtimestamp(query['since']))
+    if query['until'] is not None:
+        where.append('created_at < %s')
+        params.append(datetime.utcfromtimestamp(query['until']))
+    if query['cursor'] is not None:
+        where.append('(created_at, order_id) < (%s, %s)')
+        params.extend([datetime.fromisoformat(query['cursor']['created_at']), query['cursor']['order_id']])
+
+    # One extra row tells us whether there is a next page
+    params.append(query['limit'] + 1)
+
+    with conn.cursor(cursor_factory=cursor_factory) as cursor:
+        cursor.execute(f"""
+            SELECT order_id, customer_id, store_id, total_amount, status, created_at, updated_at
+            FROM orders
+            WHERE {' AND '.join(where)}
+            ORDER BY created_at DESC, order_id DESC
+            LIMIT %s
+        """, params)
+        rows = [dict(row) for row in cursor.fetchall()]
+
+    next_cursor = None
+    if len(rows) > query['limit']:
+        rows = rows[:query['limit']]
+        last = rows[-1]
+        next_cursor = encode_cursor({
+            'source': 'rds',
+            'query': _filters(query),
+            'created_at': last['created_at'].isoformat(),
+            'order_id': last['order_id'],
+        })
+    return rows, next_cursor
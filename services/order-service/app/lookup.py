@@ -0,0 +1,78 @@
+"""
+Multi-order lookups for GET /orders?ids= and POST /orders/lookup
+
+Staff views and corporate bulk orderers track many orders at once. Instead
+of one GET /orders/<order_id> per order, every backend is read once for all
+the orders still missing after the previous one:
+
+1. Redis, one MGET (OrderCache.get_many)
+2. DynamoDB, one BatchGetItem per 100 keys; UnprocessedKeys (throttled
+   partitions) are retried with exponential backoff
+3. RDS, one SELECT ... WHERE order_id = ANY(%s) for the rest, including
+   keys DynamoDB still had not processed after the last retry
+"""
+
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# BatchGetItem accepts at most 100 keys per call
+BATCH_GET_MAX_KEYS = 100
+
+
+class InvalidLookup(ValueError):
+    """Raised for an invalid list of order IDs"""
+
+
+def parse_ids(values, limit):
+    """
+    Validate order IDs from a comma-separated query string or a JSON list;
+    returns them deduplicated, in request order
+    """
+    if isinstance(values, str):
+        values = values.split(',')
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        raise InvalidLookup('order_ids must be a list of strings')
+
+    order_ids = list(dict.fromkeys(value.strip() for value in values if value.strip()))
+    if not order_ids:
+        raise InvalidLookup('at least one order id is required')
+    if len(order_ids) > limit:
+        raise InvalidLookup(f'at most {limit} order ids per lookup')
+    return order_ids
+
+
+def batch_get(dynamodb, table_name, order_ids, max_retries=5, retry_backoff=0.05):
+    """
+    Read orders with BatchGetItem; returns ({order_id: item}, unprocessed_ids)
+
+    dynamodb is the boto3 DynamoDB resource. IDs that are neither found nor
+    unprocessed do not exist in the table.
+    """
+    found = {}
+    unprocessed = []
+    for start in range(0, len(order_ids), BATCH_GET_MAX_KEYS):
+        request = {table_name: {'Keys': [{'order_id': order_id}
+                                         for order_id in order_ids[start:start + BATCH_GET_MAX_KEYS]]}}
+        for attempt in range(max_retries + 1):
+            if attempt:
+                time.sleep(retry_backoff * (2 ** (attempt - 1)))
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response.get('Responses', {}).get(table_name, []):
+                found[item['order_id']] = item
+            request = response.get('UnprocessedKeys') or {}
+            if not request:
+                break
+        if request:
+            keys = [key['order_id'] for key in request[table_name]['Keys']]
+            logger.warning(f"BatchGetItem left {len(keys)} keys unprocessed after {max_retries} retries")
+            unprocessed.extend(keys)
+    return found, unprocessed
+
+
+def load_from_rds(conn, cursor_factory, order_ids):
+    """Read orders from RDS in one query; returns {order_id: row}"""
+    with conn.cursor(cursor_factory=cursor_factory) as cursor:
+        cursor.execute("SELECT * FROM orders WHERE order_id = ANY(%s)", (list(order_ids),))
+        return {row['order_id']: dict(row) for row in cursor.fetchall()}
@@ -1,42 +1,96 @@
 import os
-import json
 import time
-import uuid
 from datetime import datetime
 from flask import Flask, request, jsonify
-import boto3
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 import redis
-from stress import MorningRushStress
+import clients
+from cache import build_order_cache, normalize
+from serialization import OrjsonProvider, dumps, to_dynamodb
+import db
+from db import get_pool
+from orders import build_order, order_created_event, validate_order
+from pricing import InvalidItemError, PricesUnavailableError, build_price_index
+import dispatch
+from producer import build_kinesis_producer
+import jobs
+import listing
+import lookup
+import metrics
+import outbox
+from board import ActiveOrderBoard, ACTIVE_STATUSES
+from idempotency import IdempotencyError, build_idempotency_store
+from status import PREVIOUS_STATUS, InvalidTransition, OrderNotFound, build_status_writer, transition
+from stress_profile import ProfileError, StressProfile
 
 app = Flask(__name__)
+# jsonify() and request.json go through orjson (Decimal/datetime safe)
+app.json = OrjsonProvider(app)
 
-# AWS Clients
-dynamodb = boto3.resource('dynamodb', region_name=os.environ.get('AWS_REGION', 'us-east-1'))
-kinesis = boto3.client('kinesis', region_name=os.environ.get('AWS_REGION', 'us-east-1'))
-cloudwatch = boto3.client('cloudwatch', region_name=os.environ.get('AWS_REGION', 'us-east-1'))
-
-# DynamoDB Table
-active_orders_table = dynamodb.Table(os.environ.get('DYNAMODB_ACTIVE_ORDERS_TABLE', 'cloudcafe-active-orders-dev'))
-
-# Redis Client
-redis_client = None
-if os.environ.get('REDIS_HOST'):
-    redis_client = redis.Redis(
-        host=os.environ.get('REDIS_HOST'),
-        port=int(os.environ.get('REDIS_PORT', 6379)),
-        decode_responses=True
-    )
+# AWS Clients, created per process on first use (see clients.py)
+kinesis = clients.Lazy(lambda: clients.aws_client('kinesis'))
+cloudwatch = clients.Lazy(lambda: clients.aws_client('cloudwatch'))
+
+# Per-call latency histograms for every AWS client, see metrics.py
+clients.on_client_created(metrics.instrument_aws_client)
+
+# DynamoDB Table (and the resource, for BatchGetItem)
+dynamodb = clients.Lazy(clients.dynamodb)
+active_orders_table = clients.Lazy(lambda: clients.dynamodb_table(clients.ACTIVE_ORDERS_TABLE))
+
+# Redis Client (connects on first command)
+redis_client = clients.redis_client()
+
+# Order events are batched into put_records calls. New orders normally go
+# through the RDS outbox instead (see outbox.py); the producer carries
+# status-change events and creation events whose RDS write failed.
+order_events = build_kinesis_producer(kinesis)
+
+# Read-through cache for GET /orders/<order_id>
+order_cache = build_order_cache(redis_client)
+
+# Per-store active orders for the barista dashboard
+active_board = ActiveOrderBoard(redis_client)
 
-# PostgreSQL Connection
+# Idempotency-Key records for POST /orders retries
+idempotency_store = build_idempotency_store(redis_client)
+
+# Menu prices mirrored from menu-service, refreshed in the background
+price_index = build_price_index(redis_client)
+
+# Upper bound for POST /orders/batch
+ORDER_BATCH_MAX = int(os.environ.get('ORDER_BATCH_MAX', 500))
+
+# Upper bound for GET /orders?ids= and POST /orders/lookup
+ORDER_LOOKUP_MAX = int(os.environ.get('ORDER_LOOKUP_MAX', 100))
+
+# PostgreSQL Connection (pooled per worker process, see db.py)
 def get_db_connection():
-    return psycopg2.connect(
-        host=os.environ.get('DB_HOST'),
-        port=int(os.environ.get('DB_PORT', 5432)),
-        database=os.environ.get('DB_NAME', 'cloudcafe'),
-        user=os.environ.get('DB_USER'),
-        password=os.environ.get('DB_PASSWORD')
+    return get_pool().connection()
+
+# Read-only queries go to the Aurora reader unless keys were just written
+def get_read_connection(*keys):
+    return db.read_pool(*keys).connection()
+
+# Status changes reach RDS in periodic batches, see status.py
+status_writer = build_status_writer(get_db_connection)
+
+metrics.register_stats('order_cache', order_cache.stats)
+metrics.register_stats('db_pool', lambda: get_pool().stats())
+metrics.register_stats('db_routing', db.routing_stats)
+metrics.register_stats('kinesis_producer', order_events.stats)
+metrics.register_stats('dispatch', lambda: dispatch.get_dispatcher().stats())
+
+@app.after_request
+def sync_metrics(response):
+    metrics.sync_stats()
+    return response
+
+def put_metrics(metric_data):
+    """Emit custom metrics to CloudWatch (runs on the dispatch thread)"""
+    cloudwatch.put_metric_data(
+        Namespace='CloudCafe/OrderService',
+        MetricData=metric_data
     )
 
 @app.route('/health', methods=['GET'])
@@ -45,91 +99,117 @@ def health():
     return jsonify({
         'status': 'healthy',
         'service': 'order-service',
-        'timestamp': datetime.utcnow().isoformat()
+        'timestamp': datetime.utcnow().isoformat(),
+        'db_pool': get_pool().stats(),
+        'db_reader_pool': get_pool('reader').stats() if db.has_reader() else None,
+        'db_routing': db.routing_stats(),
+        'order_cache': order_cache.stats(),
+        'dispatch': dispatch.get_dispatcher().stats(),
+        'kinesis_producer': order_events.stats(),
+        'price_index': price_index.stats(),
+        'active_board': active_board.stats(),
+        'status_writer': status_writer.stats(),
+        'idempotency': idempotency_store.stats()
     }), 200
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus metrics, merged across gunicorn workers"""
+    body, content_type = metrics.render()
+    return body, 200, {'Content-Type': content_type}
+
 @app.route('/orders', methods=['POST'])
 def create_order():
-    """Create a new order"""
-    start_time = time.time()
+    """Create a new order, at most once per Idempotency-Key"""
+    key = request.headers.get('Idempotency-Key')
+    if key is None:
+        return _create_order()
 
     try:
-        data = request.json
-        order_id = str(uuid.uuid4())
-        customer_id = data.get('customer_id')
-        store_id = data.get('store_id')
-        items = data.get('items', [])
+        claim = idempotency_store.claim(key, request.get_data())
+    except IdempotencyError as e:
+        return jsonify({'error': str(e)}), e.status_code
 
-        # Calculate total
-        total_amount = sum(item.get('price', 5.0) * item.get('quantity', 1) for item in items)
+    if claim is not None and claim.response is not None:
+        body, status_code = claim.response
+        response = jsonify(body)
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response, status_code
 
-        created_at = int(time.time())
+    response, status_code = _create_order()
+    idempotency_store.complete(claim, response.get_json(), status_code)
+    return response, status_code
 
-        order = {
-            'order_id': order_id,
-            'customer_id': customer_id,
-            'store_id': str(store_id),
-            'items': items,
-            'total_amount': total_amount,
-            'status': 'pending',
-            'created_at': created_at,
-            'ttl': created_at + 86400  # 24 hours TTL
-        }
-
-        # Write to DynamoDB (fast cache)
-        active_orders_table.put_item(Item=order)
+def _create_order():
+    start_time = time.time()
 
-        # Write to RDS (persistent storage)
+    try:
+        data = request.json
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
+            with metrics.timed('create_order', 'price'):
+                order = build_order(data, price_index)
+        except InvalidItemError as e:
+            return jsonify({'error': str(e)}), 400
+        except PricesUnavailableError as e:
+            return jsonify({'error': str(e)}), 503
+        order_id = order['order_id']
+        customer_id = order['customer_id']
+        store_id = data.get('store_id')
+        total_amount = order['total_amount']
+        created_at = order['created_at']
 
-            # Insert into orders table
-            cursor.execute("""
-                INSERT INTO orders (order_id, customer_id, store_id, total_amount, status, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON CONFLICT (order_id) DO NOTHING
-            """, (order_id, customer_id, store_id, total_amount, 'pending', datetime.utcnow()))
+        # Write to DynamoDB (fast cache)
+        with metrics.timed('create_order', 'dynamodb'):
+            active_orders_table.put_item(Item=to_dynamodb(order))
 
-            conn.commit()
-            cursor.close()
-            conn.close()
+        # Write to RDS (persistent storage), with the order event in the
+        # same transaction for the outbox relay to publish
+        event_queued = False
+        try:
+            with metrics.timed('create_order', 'rds'), get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    # Insert into orders table
+                    cursor.execute("""
+                        INSERT INTO orders (order_id, customer_id, store_id, total_amount, status, created_at)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                        ON CONFLICT (order_id) DO NOTHING
+                    """, (order_id, customer_id, store_id, total_amount, 'pending', datetime.utcnow()))
+                    queued = outbox.add_events(cursor, [(customer_id or order_id, dumps(order_created_event(order)))])
+
+                conn.commit()
+                event_queued = queued
+            db.note_write(order_id, store_id)
         except Exception as e:
             app.logger.error(f"RDS write error: {e}")
             # Continue even if RDS fails
 
-        # Publish event to Kinesis
-        try:
-            kinesis.put_record(
-                StreamName=os.environ.get('KINESIS_ORDER_EVENTS_STREAM', 'cloudcafe-order-events-dev'),
-                Data=json.dumps(order),
-                PartitionKey=customer_id
-            )
-        except Exception as e:
-            app.logger.error(f"Kinesis publish error: {e}")
+        # Write-through so the first status poll is a cache hit
+        with metrics.timed('create_order', 'cache'):
+            order_cache.set(order)
+        with metrics.timed('create_order', 'board'):
+            active_board.upsert(order)
+
+        # Without the outbox row, publish the event directly (best effort)
+        if not event_queued:
+            with metrics.timed('create_order', 'kinesis_enqueue'):
+                order_events.put(dumps(order_created_event(order)), customer_id or order_id)
 
-        # Emit custom metric
         duration = time.time() - start_time
-        try:
-            cloudwatch.put_metric_data(
-                Namespace='CloudCafe/OrderService',
-                MetricData=[
-                    {
-                        'MetricName': 'OrderCreationDuration',
-                        'Value': duration * 1000,  # milliseconds
-                        'Unit': 'Milliseconds',
-                        'Timestamp': datetime.utcnow()
-                    },
-                    {
-                        'MetricName': 'OrdersCreated',
-                        'Value': 1,
-                        'Unit': 'Count',
-                        'Timestamp': datetime.utcnow()
-                    }
-                ]
-            )
-        except Exception as e:
-            app.logger.error(f"CloudWatch metric error: {e}")
+        metrics.observe('create_order', 'total', duration)
+        dispatch.submit('cloudwatch', put_metrics, [
+            {
+                'MetricName': 'OrderCreationDuration',
+                'Value': duration * 1000,  # milliseconds
+                'Unit': 'Milliseconds',
+                'Timestamp': datetime.utcnow()
+            },
+            {
+                'MetricName': 'OrdersCreated',
+                'Value': 1,
+                'Unit': 'Count',
+                'Timestamp': datetime.utcnow()
+            }
+        ])
 
         return jsonify({
             'order_id': order_id,
@@ -142,41 +222,268 @@ def create_order():
         app.logger.error(f"Order creation error: {e}")
 
         # Emit error metric
-        try:
-            cloudwatch.put_metric_data(
-                Namespace='CloudCafe/OrderService',
-                MetricData=[{
-                    'MetricName': 'OrderCreationErrors',
-                    'Value': 1,
-                    'Unit': 'Count',
-                    'Timestamp': datetime.utcnow()
-                }]
-            )
-        except:
-            pass
+        dispatch.submit('cloudwatch', put_metrics, [{
+            'MetricName': 'OrderCreationErrors',
+            'Value': 1,
+            'Unit': 'Count',
+            'Timestamp': datetime.utcnow()
+        }])
 
         return jsonify({'error': str(e)}), 500
 
-@app.route('/orders/<order_id>', methods=['GET'])
-def get_order(order_id):
-    """Get order by ID"""
+@app.route('/orders/batch', methods=['POST'])
+def create_orders_batch():
+    """Create many orders in one request (corporate bulk orders)"""
+    start_time = time.time()
+
+    try:
+        data = request.json or {}
+        payloads = data.get('orders')
+        if not isinstance(payloads, list) or not payloads:
+            return jsonify({'error': 'orders must be a non-empty list'}), 400
+        if len(payloads) > ORDER_BATCH_MAX:
+            return jsonify({'error': f'at most {ORDER_BATCH_MAX} orders per batch'}), 400
+
+        results = []
+        orders = []
+        for index, payload in enumerate(payloads):
+            error = validate_order(payload)
+            if error:
+                results.append({'index': index, 'status': 'rejected', 'error': error})
+                continue
+            try:
+                order = build_order(payload, price_index)
+            except InvalidItemError as e:
+                results.append({'index': index, 'status': 'rejected', 'error': str(e)})
+                continue
+            except PricesUnavailableError as e:
+                # Nothing written yet; the whole batch can be retried
+                return jsonify({'error': str(e)}), 503
+            orders.append((index, order))
+            results.append(None)
+
+        # Write to DynamoDB in chunks of 25 (one BatchWriteItem each); a
+        # failed chunk only fails its own orders
+        written = []
+        for start in range(0, len(orders), 25):
+            chunk = orders[start:start + 25]
+            try:
+                with active_orders_table.batch_writer() as batch:
+                    for _, order in chunk:
+                        batch.put_item(Item=to_dynamodb(order))
+                written.extend(chunk)
+            except Exception as e:
+                app.logger.error(f"DynamoDB batch write error: {e}")
+                for index, _ in chunk:
+                    results[index] = {'index': index, 'status': 'failed', 'error': str(e)}
+
+        # Write to RDS in a single multi-row insert and transaction, with
+        # the orders' events in the outbox
+        events_queued = False
+        if written:
+            try:
+                with get_db_connection() as conn:
+                    with conn.cursor() as cursor:
+                        now = datetime.utcnow()
+                        execute_values(cursor, """
+                            INSERT INTO orders (order_id, customer_id, store_id, total_amount, status, created_at)
+                            VALUES %s
+                            ON CONFLICT (order_id) DO NOTHING
+                        """, [
+                            (o['order_id'], o['customer_id'], o['store_id'], o['total_amount'], 'pending', now)
+                            for _, o in written
+                        ], page_size=len(written))
+                        queued = outbox.add_events(cursor, [
+                            (o['customer_id'], dumps(order_created_event(o))) for _, o in written
+                        ])
+
+                    conn.commit()
+                    events_queued = queued
+                db.note_write(*(o['order_id'] for _, o in written), *{o['store_id'] for _, o in written})
+            except Exception as e:
+                app.logger.error(f"RDS batch write error: {e}")
+                # Continue even if RDS fails
+
+        order_cache.set_many([order for _, order in written])
+        active_board.upsert_many([order for _, order in written])
+
+        for index, order in written:
+            if not events_queued:
+                order_events.put(dumps(order_created_event(order)), order['customer_id'])
+            results[index] = {
+                'index': index,
+                'order_id': order['order_id'],
+                'status': 'pending',
+                'total_amount': order['total_amount'],
+                'created_at': order['created_at']
+            }
+
+        failed = len(payloads) - len(written)
+        duration = time.time() - start_time
+        dispatch.submit('cloudwatch', put_metrics, [
+            {
+                'MetricName': 'OrderBatchDuration',
+                'Value': duration * 1000,  # milliseconds
+                'Unit': 'Milliseconds',
+                'Timestamp': datetime.utcnow()
+            },
+            {
+                'MetricName': 'OrdersCreated',
+                'Value': len(written),
+                'Unit': 'Count',
+                'Timestamp': datetime.utcnow()
+            },
+            {
+                'MetricName': 'OrderCreationErrors',
+                'Value': failed,
+                'Unit': 'Count',
+                'Timestamp': datetime.utcnow()
+            }
+        ])
+
+        if not written:
+            status_code = 400 if all(r['status'] == 'rejected' for r in results) else 500
+        else:
+            status_code = 207 if failed else 201
+
+        return jsonify({
+            'created': len(written),
+            'failed': failed,
+            'results': results
+        }), status_code
+
+    except Exception as e:
+        app.logger.error(f"Batch order creation error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/orders', methods=['GET'])
+def list_orders():
+    """List a store's orders, newest first, with cursor pagination"""
+    if 'ids' in request.args:
+        return lookup_orders(request.args['ids'])
+
+    try:
+        query = listing.parse_params(request.args)
+    except listing.ListingError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        source = listing.choose_source(query)
+        if source == 'dynamodb':
+            orders, next_cursor = listing.list_from_dynamodb(active_orders_table, query)
+        else:
+            with get_read_connection(query['store_id']) as conn:
+                orders, next_cursor = listing.list_from_rds(conn, RealDictCursor, query)
+
+        return jsonify({
+            'orders': normalize(orders),
+            'count': len(orders),
+            'next_cursor': next_cursor,
+            'source': source
+        }), 200
+
+    except Exception as e:
+        app.logger.error(f"List orders error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/orders/active', methods=['GET'])
+def get_active_orders():
+    """Active (pending/preparing/ready) orders for one store, oldest first"""
+    store_id = request.args.get('store_id')
+    if not store_id:
+        return jsonify({'error': 'store_id is required'}), 400
+
     try:
-        # Try DynamoDB first (cache)
+        if active_board.enabled:
+            try:
+                orders = active_board.active_orders(store_id)
+                return jsonify({'store_id': store_id, 'orders': orders, 'count': len(orders)}), 200
+            except redis.RedisError as e:
+                app.logger.warning(f"Active order board unavailable, reading DynamoDB: {e}")
+
+        # No board: one StoreStatusIndex query per active status
+        since = int(time.time()) - listing.ACTIVE_WINDOW_SECONDS
+        orders = []
+        for status in ACTIVE_STATUSES:
+            query = {'store_id': store_id, 'status': status, 'since': since, 'until': None,
+                     'limit': listing.MAX_LIMIT, 'cursor': None}
+            page, _ = listing.list_from_dynamodb(active_orders_table, query)
+            orders.extend(page)
+        orders.sort(key=lambda order: order['created_at'])
+
+        return jsonify({'store_id': store_id, 'orders': normalize(orders), 'count': len(orders)}), 200
+
+    except Exception as e:
+        app.logger.error(f"Active orders error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def load_order(order_id):
+    """Read an order from DynamoDB, falling back to RDS"""
+    # Try DynamoDB first (active orders)
+    with metrics.timed('get_order', 'dynamodb'):
         response = active_orders_table.get_item(Key={'order_id': order_id})
 
-        if 'Item' in response:
-            return jsonify(response['Item']), 200
+    if 'Item' in response:
+        return response['Item']
+
+    # Fall back to RDS
+    with metrics.timed('get_order', 'rds'), get_read_connection(order_id) as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute("SELECT * FROM orders WHERE order_id = %s", (order_id,))
+            order = cursor.fetchone()
+
+    return dict(order) if order else None
+
+def load_orders(order_ids):
+    """Read orders from DynamoDB in batches, falling back to RDS for the rest"""
+    with metrics.timed('get_orders', 'dynamodb'):
+        found, _ = lookup.batch_get(dynamodb, clients.ACTIVE_ORDERS_TABLE, order_ids)
+
+    # Includes keys DynamoDB left unprocessed
+    missing = [order_id for order_id in order_ids if order_id not in found]
+    if missing:
+        with metrics.timed('get_orders', 'rds'), get_read_connection(*missing) as conn:
+            found.update(lookup.load_from_rds(conn, RealDictCursor, missing))
 
-        # Fall back to RDS
-        conn = get_db_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("SELECT * FROM orders WHERE order_id = %s", (order_id,))
-        order = cursor.fetchone()
-        cursor.close()
-        conn.close()
+    return found
+
+def lookup_orders(ids):
+    """Get many orders by ID: one Redis, DynamoDB and RDS round trip each"""
+    try:
+        order_ids = lookup.parse_ids(ids, ORDER_LOOKUP_MAX)
+    except lookup.InvalidLookup as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        with metrics.timed('get_orders', 'total'):
+            orders = order_cache.get_many(order_ids, load_orders)
+
+        return jsonify({
+            'orders': [orders[order_id] for order_id in order_ids if orders.get(order_id)],
+            'missing': [order_id for order_id in order_ids if not orders.get(order_id)],
+            'count': sum(1 for order in orders.values() if order)
+        }), 200
+
+    except Exception as e:
+        app.logger.error(f"Order lookup error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/orders/lookup', methods=['POST'])
+def lookup_orders_by_body():
+    """Get many orders by ID, for lists too long for a query string"""
+    data = request.json or {}
+    return lookup_orders(data.get('order_ids'))
+
+@app.route('/orders/<order_id>', methods=['GET'])
+def get_order(order_id):
+    """Get order by ID"""
+    try:
+        # Includes the DynamoDB/RDS stages on a miss
+        with metrics.timed('get_order', 'total'):
+            order = order_cache.get_or_load(order_id, lambda: load_order(order_id))
 
         if order:
-            return jsonify(dict(order)), 200
+            return jsonify(order), 200
         else:
             return jsonify({'error': 'Order not found'}), 404
 
@@ -184,30 +491,166 @@ def get_order(order_id):
         app.logger.error(f"Get order error: {e}")
         return jsonify({'error': str(e)}), 500
 
+def publish_status_event(order, previous, target):
+    """
+    Queue the status change in the outbox behind the order's created event,
+    or publish it directly while the outbox cannot take it
+    """
+    event = dumps({
+        'event_type': 'order_status_changed',
+        'order_id': order['order_id'],
+        'customer_id': order['customer_id'],
+        'store_id': order['store_id'],
+        'total_amount': order['total_amount'],
+        'previous_status': previous,
+        'status': target,
+        'timestamp': datetime.utcnow().isoformat()
+    })
+    key = order['customer_id'] or order['order_id']
+    event_queued = False
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                queued = outbox.add_events(cursor, [(key, event)])
+            conn.commit()
+            event_queued = queued
+    except Exception as e:
+        app.logger.error(f"Outbox status event error: {e}")
+    if not event_queued:
+        order_events.put(event, key)
+
+def change_status(order_id, target):
+    """Move an order along pending -> preparing -> ready -> completed"""
+    try:
+        # Only store_id is needed from it, so a cached copy is fine
+        order = order_cache.get_or_load(order_id, lambda: load_order(order_id))
+        if not order:
+            return jsonify({'error': 'Order not found'}), 404
+
+        try:
+            updated, previous = transition(active_orders_table, order, target)
+        except OrderNotFound:
+            return jsonify({'error': 'Order is no longer active'}), 404
+        except InvalidTransition as e:
+            return jsonify({'error': str(e), 'status': e.current}), 409
+
+        updated = normalize(updated)
+        if previous is not None:
+            order_cache.set(updated)
+            # Completed orders leave the board; either way the store's
+            # dashboard streams are notified
+            active_board.upsert(updated)
+            status_writer.put(order_id, target)
+            db.note_write(order_id, updated['store_id'])
+            publish_status_event(updated, previous, target)
+            dispatch.submit('cloudwatch', put_metrics, [{
+                'MetricName': 'OrderStatusChanges',
+                'Dimensions': [{'Name': 'Status', 'Value': target}],
+                'Value': 1,
+                'Unit': 'Count',
+                'Timestamp': datetime.utcnow()
+            }])
+
+        return jsonify({
+            'order_id': order_id,
+            'status': updated['status'],
+            'previous_status': previous,
+            'changed': previous is not None,
+            'updated_at': updated.get('updated_at')
+        }), 200
+
+    except Exception as e:
+        app.logger.error(f"Order status change error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/orders/<order_id>/status', methods=['PUT'])
+def update_order_status(order_id):
+    """Move an order to the next status (preparing, ready or completed)"""
+    data = request.json or {}
+    target = data.get('status')
+    if target not in PREVIOUS_STATUS:
+        return jsonify({'error': f"status must be one of {', '.join(PREVIOUS_STATUS)}"}), 400
+    return change_status(order_id, target)
+
+@app.route('/orders/<order_id>/complete', methods=['PUT', 'POST'])
+def complete_order(order_id):
+    """Hand a ready order to the customer"""
+    return change_status(order_id, 'completed')
+
 @app.route('/stress/morning-rush', methods=['POST'])
 def trigger_morning_rush():
-    """Trigger CPU stress scenario - Morning Rush"""
+    """Start the CPU stress scenario - Morning Rush - as a background job"""
     try:
         data = request.json or {}
         duration = data.get('duration_seconds', 300)
         target_cpu = data.get('target_cpu', 95)
-
-        app.logger.info(f"Starting Morning Rush stress scenario: {duration}s, target CPU {target_cpu}%")
-
-        # Run stress in background (for demo purposes, blocking in real scenario)
-        stress = MorningRushStress()
-        stress.simulate(duration_seconds=duration, target_cpu=target_cpu)
+        # One worker process per core unless given; 1 runs single-threaded
+        workers = data.get('workers')
+        if workers is not None and (not isinstance(workers, int) or isinstance(workers, bool) or workers < 1):
+            return jsonify({'error': 'workers must be a positive integer'}), 400
+
+        # A ramp profile (see stress_profile.py) replaces duration and target
+        profile = data.get('profile')
+        if profile is not None:
+            try:
+                profile = StressProfile.from_dict(profile)
+            except ProfileError as e:
+                return jsonify({'error': f"invalid profile: {e}"}), 400
+            duration = profile.duration
+            target_cpu = max(target for _, target in profile.stages)
+            profile = profile.to_dict()
+        else:
+            # Checked here, not in the job, so a bad value is a 400
+            try:
+                flat = StressProfile.flat(duration, target_cpu)
+            except (ValueError, TypeError) as e:
+                return jsonify({'error': str(e)}), 400
+            duration = flat.duration
+            target_cpu = flat.stages[0][1]
+
+        app.logger.info(f"Starting Morning Rush stress scenario: {duration}s, target CPU {target_cpu}%, "
+                        f"workers {workers or 'one per core'}")
+
+        job = jobs.start_job('morning_rush', {
+            'duration_seconds': duration,
+            'target_cpu': target_cpu,
+            'workers': workers,
+            'profile': profile
+        })
 
         return jsonify({
             'status': 'stress_started',
             'scenario': 'morning_rush',
+            'job_id': job['job_id'],
+            'status_url': f"/stress/jobs/{job['job_id']}",
             'duration_seconds': duration,
-            'target_cpu': target_cpu
-        }), 200
+            'target_cpu': target_cpu,
+            'workers': workers,
+            'profile': profile
+        }), 202
+
+    except jobs.JobConflict as e:
+        return jsonify({'error': str(e), 'job_id': e.job_id}), 409
 
     except Exception as e:
         app.logger.error(f"Stress scenario error: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/stress/jobs/<job_id>', methods=['GET'])
+def get_stress_job(job_id):
+    """Get stress job status and live progress"""
+    job = jobs.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job), 200
+
+@app.route('/stress/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_stress_job(job_id):
+    """Cancel a running stress job"""
+    job = jobs.cancel_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job), 200
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=8080)
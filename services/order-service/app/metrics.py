@@ -0,0 +1,208 @@
+"""
+Prometheus metrics for the order service
+
+- order_service_stage_duration_seconds{endpoint, stage}: each backend step
+  of create_order and get_order, timed in the request
+- order_service_aws_call_duration_seconds{service, operation}: every AWS
+  API call (retries included), timed by botocore hooks, so the Kinesis and
+  CloudWatch calls made by background threads are covered too
+- order_service_*_total / gauges: order cache, connection pool, Kinesis
+  producer and dispatcher counters, copied from their stats() at
+  most once per METRICS_SYNC_INTERVAL seconds per worker
+
+Under gunicorn each worker writes its samples to memory-mapped files in
+PROMETHEUS_MULTIPROC_DIR (set up in gunicorn.conf.py) and GET /metrics
+merges them across workers. Without it, metrics cover this process only.
+An observation is a dict lookup and an mmap write - a few microseconds.
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+# Backend calls sit between ~1 ms (Redis) and seconds (timeouts)
+BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_DURATION = Histogram(
+    'order_service_stage_duration_seconds',
+    'Duration of each step of an order request',
+    ['endpoint', 'stage'],
+    buckets=BUCKETS,
+)
+
+AWS_CALL_DURATION = Histogram(
+    'order_service_aws_call_duration_seconds',
+    'Duration of AWS API calls, including retries',
+    ['service', 'operation'],
+    buckets=BUCKETS,
+)
+
+CACHE_EVENTS = Counter(
+    'order_service_cache_events_total',
+    'Order cache lookups by outcome',
+    ['event'],
+)
+
+POOL_EVENTS = Counter(
+    'order_service_db_pool_events_total',
+    'Database connection pool events',
+    ['event'],
+)
+
+POOL_WAIT = Counter(
+    'order_service_db_pool_wait_seconds_total',
+    'Time spent waiting for a database connection',
+)
+
+POOL_CONNECTIONS = Gauge(
+    'order_service_db_pool_connections',
+    'Database connections per state',
+    ['state'],
+    multiprocess_mode='livesum',
+)
+
+DB_READS = Counter(
+    'order_service_db_reads_total',
+    'RDS reads by the endpoint they were routed to',
+    ['target'],
+)
+
+KINESIS_RECORDS = Counter(
+    'order_service_kinesis_records_total',
+    'Order events by outcome in the Kinesis producer',
+    ['outcome'],
+)
+
+DISPATCH_TASKS = Counter(
+    'order_service_dispatch_tasks_total',
+    'Background dispatcher tasks by outcome',
+    ['outcome'],
+)
+
+# Counters copied from stats(): metric -> {label value: stats key}
+_SYNCED_COUNTERS = (
+    ('order_cache', CACHE_EVENTS, {
+        'hit': 'hits', 'negative_hit': 'negative_hits', 'miss': 'misses',
+        'coalesced': 'coalesced', 'load': 'loads', 'error': 'errors',
+    }),
+    ('db_pool', POOL_EVENTS, {
+        'checkout': 'checkouts', 'wait': 'waits', 'timeout': 'timeouts',
+        'connection_opened': 'connections_opened', 'connection_discarded': 'connections_discarded',
+        'reconnect': 'reconnects',
+    }),
+    ('db_routing', DB_READS, {
+        'reader': 'reader', 'writer_no_reader': 'writer_no_reader',
+        'writer_after_write': 'writer_after_write',
+    }),
+    ('kinesis_producer', KINESIS_RECORDS, {
+        'sent': 'records_sent', 'failed': 'records_failed', 'dropped': 'records_dropped',
+        'retried': 'records_retried',
+    }),
+    ('dispatch', DISPATCH_TASKS, {
+        'processed': 'processed', 'failed': 'failed', 'dropped': 'dropped',
+        'backpressure_wait': 'backpressure_waits',
+    }),
+)
+
+SYNC_INTERVAL = float(os.environ.get('METRICS_SYNC_INTERVAL', 1.0))
+
+_sources = {}
+_last_seen = {}
+_last_sync = 0.0
+_sync_lock = threading.Lock()
+
+
+@contextmanager
+def timed(endpoint, stage):
+    """Observe the duration of a with-block as one stage of an endpoint"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_DURATION.labels(endpoint, stage).observe(time.perf_counter() - start)
+
+
+def observe(endpoint, stage, seconds):
+    STAGE_DURATION.labels(endpoint, stage).observe(seconds)
+
+
+def instrument_aws_client(client):
+    """Time every API call made through a boto3 client"""
+    service = client.meta.service_model.service_id.hyphenize()
+    events = client.meta.events
+
+    def before_call(context, **kwargs):
+        context['metrics_start'] = time.perf_counter()
+
+    def after_call(context, event_name, **kwargs):
+        start = context.pop('metrics_start', None)
+        if start is not None:
+            operation = event_name.rsplit('.', 1)[1]
+            AWS_CALL_DURATION.labels(service, operation).observe(time.perf_counter() - start)
+
+    events.register(f'before-call.{service}', before_call)
+    events.register(f'after-call.{service}', after_call)
+    # Calls that raise (throttling after retries, timeouts) count as well
+    events.register(f'after-call-error.{service}', after_call)
+    return client
+
+
+def register_stats(name, stats):
+    """Export a component's stats() counters (see _SYNCED_COUNTERS)"""
+    _sources[name] = stats
+
+
+def sync_stats():
+    """Copy stats() counters into metrics; cheap enough to call per request"""
+    global _last_sync
+    now = time.monotonic()
+    if now - _last_sync < SYNC_INTERVAL or not _sync_lock.acquire(blocking=False):
+        return
+    try:
+        _last_sync = now
+        # Counters live per process; a forked worker starts from zero
+        pid = os.getpid()
+        if _last_seen.get('pid') != pid:
+            _last_seen.clear()
+            _last_seen['pid'] = pid
+
+        values = {}
+        for name, stats in _sources.items():
+            values[name] = stats()
+
+        for name, metric, fields in _SYNCED_COUNTERS:
+            if name not in values:
+                continue
+            for label, key in fields.items():
+                _inc(metric.labels(label), (name, key), values[name].get(key, 0))
+
+        if 'db_pool' in values:
+            pool = values['db_pool']
+            _inc(POOL_WAIT, ('db_pool', 'wait_time_ms_total'), pool['wait_time_ms_total'] / 1000.0)
+            POOL_CONNECTIONS.labels('in_use').set(pool['in_use'])
+            POOL_CONNECTIONS.labels('idle').set(pool['idle'])
+    finally:
+        _sync_lock.release()
+
+
+def _inc(counter, key, value):
+    delta = value - _last_seen.get(key, 0)
+    if delta > 0:
+        counter.inc(delta)
+    _last_seen[key] = value
+
+
+def render():
+    """Return (body, content_type) for GET /metrics"""
+    sync_stats()
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,61 @@
+"""
+Order construction and validation shared by the Flask and ASGI apps
+"""
+
+import time
+import uuid
+
+from pricing import price_items
+
+
+def build_order(data, price_index=None):
+    """
+    Build a new pending order from a request payload
+
+    Items are priced server-side from the menu price index; raises
+    pricing.InvalidItemError for items the menu does not sell and for
+    invalid quantities, and pricing.PricesUnavailableError when no prices
+    are loaded.
+    """
+    items, total_amount, price_version = price_items(data.get('items', []), price_index)
+
+    created_at = int(time.time())
+    store_id = str(data.get('store_id'))
+
+    order = {
+        'order_id': str(uuid.uuid4()),
+        'customer_id': data.get('customer_id'),
+        'store_id': store_id,
+        'store_status': f"{store_id}#pending",  # StoreStatusIndex hash key
+        'items': items,
+        'total_amount': total_amount,
+        'status': 'pending',
+        'created_at': created_at,
+        'ttl': created_at + 86400  # 24 hours TTL
+    }
+    if price_version is not None:
+        order['price_version'] = price_version
+    return order
+
+
+def order_created_event(order):
+    """The order_created event payload: the order plus its event_type"""
+    return dict(order, event_type='order_created')
+
+
+def validate_order(data):
+    """Return an error message for a malformed order payload, or None"""
+    if not isinstance(data, dict):
+        return 'order must be an object'
+    if not data.get('customer_id'):
+        return 'customer_id is required'
+    if data.get('store_id') is None:
+        return 'store_id is required'
+    items = data.get('items', [])
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return 'items must be a list of objects'
+    for item in items:
+        quantity = item.get('quantity', 1)
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+            return 'item quantity must be a positive integer'
+    return None
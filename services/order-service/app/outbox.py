@@ -0,0 +1,292 @@
+"""
+Transactional outbox for order events
+
+create_order writes the order row and its order_created event to
+order_events_outbox in the same Postgres transaction, so an event exists
+exactly when the order does and publishing never sits on the request path.
+A status change queues its order_status_changed event right after the
+DynamoDB update succeeds, in a transaction of its own (the RDS status copy
+is written later, in batches), so a crash between the update and that
+commit loses the event. The relay, a separate process started as
+
+    python outbox.py
+
+drains the outbox oldest first in put_records batches of up to 500 and
+deletes what Kinesis accepted, up to the first rejected record of each
+partition key. A rejected record and every later one for its key stay in
+the outbox and go out again, in order, with the next batch. Delivery is
+therefore at least once - consumers must tolerate duplicates (order_id and
+event_type, plus status for status changes, identify an event) - and per
+partition key, each event's last copy arrives after the last copy of every
+earlier event.
+
+deploy-order-service.sh runs the relay as a sidecar of every order-service
+task; only one drains at a time - the others wait on a Postgres advisory
+lock. The relay creates the outbox table if it is missing. Until the table
+exists, add_events queues nothing and events are published directly, as
+they were before the outbox, so the order row is never lost to a failed
+outbox INSERT; the ordering above only covers events that went through the
+outbox. Every OUTBOX_LAG_REPORT_INTERVAL seconds the relay reports its
+backlog and the age of the oldest unpublished event to CloudWatch
+(OutboxBacklog, OutboxLagSeconds).
+"""
+
+import os
+import sys
+import time
+import signal
+import logging
+from datetime import datetime
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from producer import MAX_BATCH_BYTES, MAX_BATCH_RECORDS
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_TABLE = 'order_events_outbox'
+
+# pg_try_advisory_lock key held by the active relay
+RELAY_LOCK_ID = 7_420_015
+
+# Same DDL as scripts/init-rds-schema.sql
+CREATE_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {OUTBOX_TABLE} (
+        id BIGSERIAL PRIMARY KEY,
+        partition_key VARCHAR(255) NOT NULL,
+        payload TEXT NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+TABLE_EXISTS = "SELECT to_regclass(%s) IS NOT NULL"
+
+
+class TableCheck:
+    """Whether the outbox table exists; rechecked every interval seconds until it does"""
+
+    def __init__(self, interval=60.0):
+        self.interval = interval
+        self.exists = False
+        self._checked_at = None
+
+    def due(self):
+        return not self.exists and (
+            self._checked_at is None or time.monotonic() - self._checked_at >= self.interval)
+
+    def update(self, exists):
+        self.exists = bool(exists)
+        self._checked_at = time.monotonic()
+
+
+table_check = TableCheck(float(os.environ.get('OUTBOX_TABLE_CHECK_INTERVAL', 60)))
+
+
+def add_events(cursor, events):
+    """
+    Queue (partition_key, payload) events in the caller's transaction;
+    returns False, queuing nothing, while the outbox table does not exist
+    """
+    if table_check.due():
+        cursor.execute(TABLE_EXISTS, (OUTBOX_TABLE,))
+        table_check.update(cursor.fetchone()[0])
+    if not table_check.exists:
+        return False
+    execute_values(cursor, f"""
+        INSERT INTO {OUTBOX_TABLE} (partition_key, payload)
+        VALUES %s
+    """, [(str(key), payload) for key, payload in events], page_size=len(events) or 1)
+    return True
+
+
+class OutboxRelay:
+    """Publishes outbox rows to Kinesis in order per partition key, deleting them once accepted"""
+
+    def __init__(self, connect, kinesis, cloudwatch, stream_name, batch_size=500,
+                 poll_interval=0.2, lag_report_interval=10.0):
+        self.connect = connect
+        self.kinesis = kinesis
+        self.cloudwatch = cloudwatch
+        self.stream_name = stream_name
+        self.batch_size = min(batch_size, MAX_BATCH_RECORDS)
+        self.poll_interval = poll_interval
+        self.lag_report_interval = lag_report_interval
+
+        self._conn = None
+        self._last_report = 0.0
+        self.counters = {
+            'events_published': 0,
+            'events_failed': 0,
+            'events_held': 0,
+            'batches_sent': 0,
+            'publish_errors': 0,
+            'backlog': 0,
+            'lag_seconds': 0.0,
+        }
+
+    def _lead(self, should_stop):
+        """Connect and wait until this relay holds the advisory lock"""
+        conn = self.connect()
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            while not should_stop():
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", (RELAY_LOCK_ID,))
+                if cursor.fetchone()[0]:
+                    # The migration for databases created before the outbox
+                    cursor.execute(CREATE_TABLE)
+                    conn.autocommit = False
+                    logger.info("Outbox relay is active")
+                    return conn
+                time.sleep(self.lag_report_interval)
+        conn.close()
+        return None
+
+    def run(self, should_stop):
+        while not should_stop():
+            try:
+                if self._conn is None or self._conn.closed:
+                    self._conn = self._lead(should_stop)
+                    if self._conn is None:
+                        return
+                published = self.drain_once()
+                self._maybe_report()
+                if published < self.batch_size:
+                    time.sleep(self.poll_interval)
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                logger.error(f"Outbox relay lost its database connection: {e}")
+                self._close()
+                time.sleep(1.0)
+        self._close()
+
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+
+    def drain_once(self):
+        """Publish one batch; returns the number of events Kinesis accepted"""
+        conn = self._conn
+        with conn.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT id, partition_key, payload
+                FROM {OUTBOX_TABLE}
+                ORDER BY id
+                LIMIT %s
+            """, (self.batch_size,))
+            rows = cursor.fetchall()
+        conn.rollback()
+        if not rows:
+            return 0
+
+        # Stay under the 5 MB put_records limit
+        batch, size = [], 0
+        for row in rows:
+            record_size = len(row[2].encode()) + len(row[1])
+            if batch and size + record_size > MAX_BATCH_BYTES:
+                break
+            batch.append(row)
+            size += record_size
+
+        try:
+            response = self.kinesis.put_records(
+                StreamName=self.stream_name,
+                Records=[{'Data': payload.encode(), 'PartitionKey': key} for _, key, payload in batch]
+            )
+        except Exception as e:
+            self.counters['publish_errors'] += 1
+            logger.error(f"Outbox put_records error: {e}")
+            time.sleep(self.poll_interval)
+            return 0
+
+        # Results are positional. A rejected row stays for the next batch,
+        # and so do the later rows for its key, so they are re-sent after it
+        sent = []
+        blocked = set()
+        for (row_id, key, _), result in zip(batch, response['Records']):
+            if 'ErrorCode' in result:
+                blocked.add(key)
+            elif key not in blocked:
+                sent.append(row_id)
+        failed = sum(1 for result in response['Records'] if 'ErrorCode' in result)
+        self.counters['batches_sent'] += 1
+        self.counters['events_published'] += len(batch) - failed
+        self.counters['events_failed'] += failed
+        self.counters['events_held'] += len(batch) - failed - len(sent)
+
+        if sent:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {OUTBOX_TABLE} WHERE id = ANY(%s)", (sent,))
+            conn.commit()
+        return len(sent)
+
+    def _maybe_report(self):
+        now = time.monotonic()
+        if now - self._last_report < self.lag_report_interval:
+            return
+        self._last_report = now
+
+        with self._conn.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT count(*), COALESCE(EXTRACT(EPOCH FROM clock_timestamp() - min(created_at)), 0)
+                FROM {OUTBOX_TABLE}
+            """)
+            backlog, lag = cursor.fetchone()
+        self._conn.rollback()
+        self.counters['backlog'] = backlog
+        self.counters['lag_seconds'] = float(lag)
+
+        logger.info(f"Outbox relay: {self.stats()}")
+        try:
+            self.cloudwatch.put_metric_data(
+                Namespace='CloudCafe/OrderService',
+                MetricData=[
+                    {'MetricName': 'OutboxLagSeconds', 'Value': float(lag), 'Unit': 'Seconds',
+                     'Timestamp': datetime.utcnow()},
+                    {'MetricName': 'OutboxBacklog', 'Value': backlog, 'Unit': 'Count',
+                     'Timestamp': datetime.utcnow()},
+                ]
+            )
+        except Exception as e:
+            logger.error(f"CloudWatch metric error: {e}")
+
+    def stats(self):
+        return dict(self.counters)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    import boto3
+    from db import get_pool
+    connect_kwargs = get_pool().connect_kwargs
+    region = os.environ.get('AWS_REGION', 'us-east-1')
+
+    relay = OutboxRelay(
+        lambda: psycopg2.connect(**connect_kwargs),
+        boto3.client('kinesis', region_name=region),
+        boto3.client('cloudwatch', region_name=region),
+        os.environ.get('KINESIS_ORDER_EVENTS_STREAM', 'cloudcafe-order-events-dev'),
+        batch_size=int(os.environ.get('OUTBOX_BATCH_SIZE', 500)),
+        poll_interval=float(os.environ.get('OUTBOX_POLL_INTERVAL', 0.2)),
+        lag_report_interval=float(os.environ.get('OUTBOX_LAG_REPORT_INTERVAL', 10)),
+    )
+
+    stopping = False
+
+    def on_signal(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+
+    relay.run(lambda: stopping)
+    logger.info(f"Outbox relay stopped: {relay.stats()}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+In-process menu price index for server-side order pricing
+
+menu-service publishes item prices to Redis whenever an item is written:
+
+    menu:prices            hash   item_id -> {"price": ..., "available": ..., "version": n}
+    menu:prices:version    string latest version number
+    menu:prices:changes    zset   item_id scored by the version that changed it
+
+Each worker keeps a plain dict copy of the hash. A background thread polls
+the version key and applies only the items changed since the version it
+holds, so pricing an order is a dict lookup and never a network hop.
+menu-service backfills the hash with the whole menu at startup; until then,
+items missing from it are taken from the cached menu:all item list. With
+no prices at all (no Redis, or nothing published or cached yet) orders are
+refused rather than priced from the request.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+PRICES_KEY = 'menu:prices'
+VERSION_KEY = 'menu:prices:version'
+CHANGES_KEY = 'menu:prices:changes'
+MENU_ALL_KEY = 'menu:all'
+
+
+class InvalidItemError(ValueError):
+    """Raised for an order item that cannot be priced"""
+
+
+class UnknownItemError(InvalidItemError):
+    """Raised when an order references an item the price index does not know"""
+
+
+class PricesUnavailableError(Exception):
+    """Raised when no menu prices are loaded to price an order with"""
+
+
+class PriceIndex:
+    """Versioned item_id -> price map mirrored from Redis"""
+
+    def __init__(self, client, refresh_interval=5.0):
+        self.client = client
+        self.refresh_interval = refresh_interval
+        # Replaced wholesale on refresh, never mutated, so readers need no lock
+        self._prices = {}
+        self.version = None
+
+        self.counters = {
+            'full_loads': 0,
+            'incremental_refreshes': 0,
+            'items_updated': 0,
+            'refresh_errors': 0,
+        }
+        self.pid = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self.client is None or (self._thread is not None and self.pid == os.getpid()):
+            return
+        with self._lock:
+            if self._thread is not None and self.pid == os.getpid():
+                return
+            # First use in this process (threads do not survive fork)
+            self.pid = os.getpid()
+            try:
+                self.refresh()
+            except Exception as e:
+                self.counters['refresh_errors'] += 1
+                logger.error(f"Price index load error: {e}")
+            self._thread = threading.Thread(target=self._run, name='price-index', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                self.counters['refresh_errors'] += 1
+                logger.error(f"Price index refresh error: {e}")
+
+    @staticmethod
+    def _parse(raw):
+        entry = json.loads(raw)
+        return {'price': float(entry['price']), 'available': entry.get('available', True)}
+
+    def _full_load(self):
+        version = int(self.client.get(VERSION_KEY) or 0)
+        prices = {item_id: self._parse(raw) for item_id, raw in self.client.hgetall(PRICES_KEY).items()}
+
+        # Items menu-service has not published yet come from its item cache;
+        # published prices are newer and win
+        cached = self.client.get(MENU_ALL_KEY)
+        for item in json.loads(cached) if cached else []:
+            if item.get('item_id') and item.get('price') is not None and item['item_id'] not in prices:
+                prices[item['item_id']] = {
+                    'price': float(item['price']),
+                    'available': item.get('available', True),
+                }
+
+        self._prices = prices
+        self.version = version
+        self.counters['full_loads'] += 1
+
+    def refresh(self):
+        """Apply the changes published since the version we hold"""
+        if self.version is None:
+            return self._full_load()
+
+        latest = int(self.client.get(VERSION_KEY) or 0)
+        if latest == self.version:
+            return
+        if latest < self.version:
+            # Redis was flushed or replaced
+            return self._full_load()
+
+        changes = self.client.zrangebyscore(CHANGES_KEY, f"({self.version}", latest, withscores=True)
+        oldest = self.client.zrange(CHANGES_KEY, 0, 0, withscores=True)
+        if not self._prices or (oldest and oldest[0][1] > self.version + 1):
+            # The change log was trimmed past our version
+            return self._full_load()
+
+        item_ids = [item_id for item_id, _ in changes]
+        prices = dict(self._prices)
+        if item_ids:
+            for item_id, raw in zip(item_ids, self.client.hmget(PRICES_KEY, item_ids)):
+                if raw is None:
+                    prices.pop(item_id, None)
+                else:
+                    prices[item_id] = self._parse(raw)
+
+        self._prices = prices
+        self.version = latest
+        self.counters['incremental_refreshes'] += 1
+        self.counters['items_updated'] += len(item_ids)
+
+    @property
+    def loaded(self):
+        self._ensure_started()
+        return bool(self._prices)
+
+    def snapshot(self):
+        """Return (prices, version) as one consistent pair"""
+        self._ensure_started()
+        return self._prices, self.version
+
+    def stats(self):
+        return dict(self.counters, items=len(self._prices), version=self.version)
+
+
+def price_items(items, price_index):
+    """
+    Price order items from the index; returns (priced_items, total, version)
+
+    Raises InvalidItemError for a quantity that is not a positive integer,
+    and PricesUnavailableError without a loaded index (no Redis, or menu
+    never published): prices never come from the request.
+    """
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise InvalidItemError('items must be a list of objects')
+    for item in items:
+        quantity = item.get('quantity', 1)
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+            raise InvalidItemError(f"item quantity must be a positive integer: {item.get('item_id')}")
+
+    prices, version = price_index.snapshot() if price_index is not None else ({}, None)
+    if not prices:
+        raise PricesUnavailableError('menu prices are not available, try again shortly')
+
+    priced = []
+    total = 0.0
+    for item in items:
+        entry = prices.get(item.get('item_id'))
+        if entry is None or not entry['available']:
+            raise UnknownItemError(f"unknown or unavailable item: {item.get('item_id')}")
+        quantity = item.get('quantity', 1)
+        priced.append(dict(item, price=entry['price']))
+        total += entry['price'] * quantity
+    return priced, round(total, 2), version
+
+
+def build_price_index(client):
+    return PriceIndex(client, refresh_interval=float(os.environ.get('PRICE_INDEX_REFRESH_INTERVAL', 5)))
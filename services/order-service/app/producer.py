@@ -0,0 +1,194 @@
+"""
+Batching Kinesis producer for order events
+
+Buffers events in memory and ships them with put_records, so the 4-shard
+order-events stream sees one API call per batch instead of one per order.
+A batch is flushed when it reaches KINESIS_BATCH_SIZE records or when its
+oldest record has waited KINESIS_LINGER_MS. Records rejected in a partially
+failed batch (throttling, internal errors) are retried on their own with
+backoff; records that still fail are dropped and counted.
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# put_records service limits
+MAX_BATCH_RECORDS = 500
+MAX_BATCH_BYTES = 5 * 1024 * 1024
+
+_producers = []
+
+
+class KinesisProducer:
+    """Size/linger batching producer with a background flush thread"""
+
+    def __init__(self, client, stream_name, batch_size=500, linger_ms=50,
+                 max_buffered=10000, max_retries=3, retry_backoff_ms=100):
+        self.client = client
+        self.stream_name = stream_name
+        self.batch_size = min(batch_size, MAX_BATCH_RECORDS)
+        self.linger = linger_ms / 1000.0
+        self.max_buffered = max_buffered
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff_ms / 1000.0
+
+        self.counters = {
+            'records_buffered': 0,
+            'records_sent': 0,
+            'records_failed': 0,
+            'records_dropped': 0,
+            'records_retried': 0,
+            'batches_sent': 0,
+            'batch_size_max': 0,
+            'buffer_latency_ms_total': 0.0,
+            'buffer_latency_ms_max': 0.0,
+        }
+        self._reset()
+        _producers.append(self)
+
+    def _reset(self):
+        # Buffer and thread belong to one process; a forked worker starts empty
+        self.pid = os.getpid()
+        self._cond = threading.Condition()
+        self._buffer = []  # (enqueued_at, data, partition_key)
+        self._thread = None
+        self._closed = False
+
+    def _ensure_started(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='kinesis-producer', daemon=True)
+            self._thread.start()
+
+    def put(self, data, partition_key):
+        """Buffer one record; returns False if it was dropped"""
+        if isinstance(data, str):
+            data = data.encode()
+        with self._cond:
+            self._ensure_started()
+            if self._closed or len(self._buffer) >= self.max_buffered:
+                self.counters['records_dropped'] += 1
+                return False
+            self._buffer.append((time.monotonic(), data, str(partition_key)))
+            self.counters['records_buffered'] += 1
+            # Wake the flusher to start the linger timer, or to ship a full batch
+            if len(self._buffer) == 1 or len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def _take_batch(self):
+        """Pop up to batch_size records, staying under the 5 MB request limit"""
+        batch, size = [], 0
+        for entry in self._buffer:
+            record_size = len(entry[1]) + len(entry[2])
+            if batch and (len(batch) >= self.batch_size or size + record_size > MAX_BATCH_BYTES):
+                break
+            batch.append(entry)
+            size += record_size
+        del self._buffer[:len(batch)]
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if len(self._buffer) >= self.batch_size:
+                        break
+                    if self._buffer:
+                        remaining = self._buffer[0][0] + self.linger - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                if self._closed and not self._buffer:
+                    return
+                batch = self._take_batch()
+            self._send(batch)
+
+    def _send(self, batch):
+        now = time.monotonic()
+        for enqueued_at, _, _ in batch:
+            latency_ms = (now - enqueued_at) * 1000
+            self.counters['buffer_latency_ms_total'] += latency_ms
+            if latency_ms > self.counters['buffer_latency_ms_max']:
+                self.counters['buffer_latency_ms_max'] = latency_ms
+        self.counters['batches_sent'] += 1
+        self.counters['batch_size_max'] = max(self.counters['batch_size_max'], len(batch))
+
+        pending = batch
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.retry_backoff * (2 ** (attempt - 1)))
+                self.counters['records_retried'] += len(pending)
+            try:
+                response = self.client.put_records(
+                    StreamName=self.stream_name,
+                    Records=[{'Data': data, 'PartitionKey': key} for _, data, key in pending]
+                )
+            except Exception as e:
+                logger.error(f"Kinesis put_records error: {e}")
+                continue
+
+            # Results are positional; keep only the records that failed
+            failed = [entry for entry, result in zip(pending, response['Records']) if 'ErrorCode' in result]
+            self.counters['records_sent'] += len(pending) - len(failed)
+            if not failed:
+                return
+            pending = failed
+
+        self.counters['records_failed'] += len(pending)
+        logger.error(f"Dropped {len(pending)} order events after {self.max_retries} retries")
+
+    def close(self, timeout=5.0):
+        """Flush everything buffered and stop the flush thread"""
+        with self._cond:
+            if self.pid != os.getpid() or self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.warning(f"Kinesis producer not drained on shutdown, {len(self._buffer)} records lost")
+
+    def stats(self):
+        stats = dict(self.counters, buffered=len(self._buffer))
+        sent = stats['records_sent'] + stats['records_failed'] or 1
+        stats['batch_size_avg'] = sent / (stats['batches_sent'] or 1)
+        stats['buffer_latency_ms_avg'] = stats['buffer_latency_ms_total'] / sent
+        return stats
+
+
+def build_kinesis_producer(client):
+    return KinesisProducer(
+        client,
+        os.environ.get('KINESIS_ORDER_EVENTS_STREAM', 'cloudcafe-order-events-dev'),
+        batch_size=int(os.environ.get('KINESIS_BATCH_SIZE', 500)),
+        linger_ms=int(os.environ.get('KINESIS_LINGER_MS', 50)),
+        max_buffered=int(os.environ.get('KINESIS_MAX_BUFFERED', 10000)),
+        max_retries=int(os.environ.get('KINESIS_MAX_RETRIES', 3)),
+    )
+
+
+def shutdown(timeout=5.0):
+    """Flush every producer in this process (gunicorn worker_exit / atexit)"""
+    for producer in _producers:
+        producer.close(timeout)
+
+
+def _after_fork():
+    # The forked worker inherits the parent's lock, possibly held, and its
+    # buffer; swap them before any thread can use them (preload_app builds
+    # the producers in the gunicorn master)
+    for producer in _producers:
+        producer._reset()
+
+
+atexit.register(shutdown)
+os.register_at_fork(after_in_child=_after_fork)
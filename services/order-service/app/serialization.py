@@ -0,0 +1,65 @@
+"""
+JSON serialization for the order service
+
+One encoder for everything the service emits: Flask responses, Kinesis and
+outbox payloads, Redis cache and board values. It is orjson with a default
+hook for the types orders pick up on the way through the backends:
+DynamoDB Decimals become int or float, sets become lists. datetime and
+date are encoded natively as ISO 8601. orjson emits compact JSON and encodes
+and decodes order-sized documents about 3x faster than the stdlib json
+module (see benchmarks/serialization.py).
+
+DynamoDB rejects floats on the way in, so to_dynamodb() converts an
+order's floats to Decimal before a put.
+"""
+
+from decimal import Decimal
+
+import orjson
+from flask.json.provider import JSONProvider
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumpb(value):
+    """Encode to JSON bytes"""
+    return orjson.dumps(value, default=_default)
+
+
+def dumps(value):
+    """Encode to a JSON str"""
+    return orjson.dumps(value, default=_default).decode()
+
+
+loads = orjson.loads
+
+
+def to_dynamodb(value):
+    """boto3 rejects floats, so numbers go to DynamoDB as Decimal"""
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {k: to_dynamodb(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_dynamodb(v) for v in value]
+    return value
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider, so jsonify() and request.json use orjson"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumpb(obj), mimetype='application/json')
@@ -0,0 +1,229 @@
+"""
+Order status transitions
+
+An order moves pending -> preparing -> ready -> completed. Each step is a
+single DynamoDB UpdateItem conditioned on the current status, so two
+baristas clicking the same order cannot both move it, and a stale click
+cannot move it backwards. A repeated click for the status the order is
+already in succeeds without writing anything.
+
+The RDS copy of the status is not written per click. StatusWriter keeps the
+latest status of each changed order in memory and applies them in one
+batched UPDATE every RDS_STATUS_FLUSH_INTERVAL seconds (or sooner once
+RDS_STATUS_BATCH_SIZE orders are waiting), so an order moved through all
+three steps between flushes costs one row update. The UPDATE never moves a
+row backwards in the flow, whatever order the workers' flushes land in.
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from botocore.exceptions import ClientError
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+ORDER_FLOW = ('pending', 'preparing', 'ready', 'completed')
+
+# target status -> the status an order must be in to move there
+PREVIOUS_STATUS = dict(zip(ORDER_FLOW[1:], ORDER_FLOW))
+
+# Position of a status in the flow, for the never-backwards UPDATE guard
+_FLOW_POSITION = f"array_position(ARRAY[{', '.join(repr(s) for s in ORDER_FLOW)}]::text[], %s::text)"
+
+_writers = []
+
+
+class OrderNotFound(LookupError):
+    """Raised when transitioning an order that does not exist"""
+
+
+class InvalidTransition(Exception):
+    """Raised when an order cannot move to the requested status"""
+
+    def __init__(self, order_id, current, target):
+        super().__init__(f"Order {order_id} is {current}, cannot move to {target}")
+        self.current = current
+        self.target = target
+
+
+def transition(table, order, target):
+    """
+    Move an order to the target status with a conditional update
+
+    The order only needs order_id and store_id (a cached copy will do).
+    Returns (updated_order, previous_status); previous_status is None when
+    the order was already in the target status and nothing was written.
+    """
+    if target not in PREVIOUS_STATUS:
+        raise ValueError(f"status must be one of {', '.join(PREVIOUS_STATUS)}")
+    previous = PREVIOUS_STATUS[target]
+    order_id = order['order_id']
+
+    try:
+        response = table.update_item(
+            Key={'order_id': order_id},
+            UpdateExpression='SET #status = :target, store_status = :store_status, updated_at = :now',
+            ConditionExpression='#status = :previous',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={
+                ':target': target,
+                ':previous': previous,
+                ':store_status': f"{order['store_id']}#{target}",  # StoreStatusIndex hash key
+                ':now': int(time.time()),
+            },
+            ReturnValues='ALL_NEW',
+        )
+        return response['Attributes'], previous
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+    # Lost the condition: find out whether it is a repeat or a conflict
+    item = table.get_item(Key={'order_id': order_id}, ConsistentRead=True).get('Item')
+    if item is None:
+        raise OrderNotFound(order_id)
+    if item['status'] == target:
+        return item, None
+    raise InvalidTransition(order_id, item['status'], target)
+
+
+class StatusWriter:
+    """Coalesces order status changes into periodic batched RDS updates"""
+
+    def __init__(self, get_connection, flush_interval=1.0, batch_size=500, max_pending=10000):
+        self.get_connection = get_connection
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+
+        self.counters = {
+            'updates_queued': 0,
+            'updates_coalesced': 0,
+            'updates_dropped': 0,
+            'rows_written': 0,
+            'flushes': 0,
+            'flush_errors': 0,
+        }
+        self._reset()
+        _writers.append(self)
+
+    def _reset(self):
+        # Pending writes and thread belong to one process
+        self.pid = os.getpid()
+        self._cond = threading.Condition()
+        self._pending = {}  # order_id -> (status, updated_at)
+        self._thread = None
+        self._closed = False
+
+    def _ensure_started(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='rds-status-writer', daemon=True)
+            self._thread.start()
+
+    def put(self, order_id, status):
+        """Queue the order's new status; replaces any not yet written"""
+        with self._cond:
+            self._ensure_started()
+            self._merge(order_id, status, datetime.utcnow())
+            self.counters['updates_queued'] += 1
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def _merge(self, order_id, status, updated_at):
+        current = self._pending.get(order_id)
+        if current is None and len(self._pending) >= self.max_pending:
+            # RDS has been unreachable for a while; DynamoDB stays correct
+            self.counters['updates_dropped'] += 1
+            return
+        if current is not None:
+            self.counters['updates_coalesced'] += 1
+            if ORDER_FLOW.index(current[0]) >= ORDER_FLOW.index(status):
+                return
+        self._pending[order_id] = (status, updated_at)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._closed and not self._pending:
+                    return
+                batch, self._pending = self._pending, {}
+                closed = self._closed
+            if batch and not self._write(batch) and not closed:
+                # Put the batch back behind anything newer and retry next round
+                with self._cond:
+                    for order_id, (status, updated_at) in batch.items():
+                        self._merge(order_id, status, updated_at)
+            if closed:
+                return
+
+    def _write(self, batch):
+        self.counters['flushes'] += 1
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    execute_values(cursor, f"""
+                        UPDATE orders AS o
+                        SET status = v.status, updated_at = v.updated_at
+                        FROM (VALUES %s) AS v (order_id, status, updated_at)
+                        WHERE o.order_id = v.order_id
+                          AND {_FLOW_POSITION % 'o.status'} < {_FLOW_POSITION % 'v.status'}
+                    """, [
+                        (order_id, status, updated_at)
+                        for order_id, (status, updated_at) in batch.items()
+                    ], page_size=len(batch))
+                conn.commit()
+            self.counters['rows_written'] += len(batch)
+            return True
+        except Exception as e:
+            self.counters['flush_errors'] += 1
+            logger.error(f"RDS status flush error ({len(batch)} orders): {e}")
+            return False
+
+    def close(self, timeout=5.0):
+        """Write everything pending and stop the flush thread"""
+        with self._cond:
+            if self.pid != os.getpid() or self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.warning(f"RDS status writer not drained on shutdown, {len(self._pending)} updates lost")
+
+    def stats(self):
+        return dict(self.counters, pending=len(self._pending))
+
+
+def build_status_writer(get_connection):
+    return StatusWriter(
+        get_connection,
+        flush_interval=float(os.environ.get('RDS_STATUS_FLUSH_INTERVAL', 1.0)),
+        batch_size=int(os.environ.get('RDS_STATUS_BATCH_SIZE', 500)),
+        max_pending=int(os.environ.get('RDS_STATUS_MAX_PENDING', 10000)),
+    )
+
+
+def shutdown(timeout=5.0):
+    """Flush every status writer in this process (gunicorn worker_exit / atexit)"""
+    for writer in _writers:
+        writer.close(timeout)
+
+
+def _after_fork():
+    # With preload_app the writers are built in the gunicorn master; give
+    # each worker its own lock and pending map before it handles a request
+    for writer in _writers:
+        writer._reset()
+
+
+atexit.register(shutdown)
+os.register_at_fork(after_in_child=_after_fork)
@@ -2,12 +2,41 @@ import time
 import hashlib
 import json
 import random
+import multiprocessing
 from datetime import datetime
-import psutil
-import boto3
 import os
+import clients
+from cpu_controller import DutyCycle, DutyCycleController
+from stress_profile import StressProfile
+
+# Created on first use, in the job process (see clients.py)
+cloudwatch = clients.Lazy(lambda: clients.aws_client('cloudwatch'))
+
+
+def default_workers():
+    """One worker process per core available to this task"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _rush_worker(counter, stop, duty, parent_pid, seed):
+    """
+    Worker process of the multi-core mode: processes orders until told to
+    stop, counting iterations in counter and keeping busy for the duty
+    cycle the parent's controller publishes
+    """
+    scenario = MorningRushStress(seed)
+    cycle = DutyCycle(lambda: duty.value)
+    while not stop.is_set():
+        # Never outlive a job process that was killed outright
+        if os.getppid() != parent_pid:
+            return
+        scenario._process_orders(stop.is_set, cycle.pace)
+        with counter.get_lock():
+            counter.value += 1
 
-cloudwatch = boto3.client('cloudwatch', region_name=os.environ.get('AWS_REGION', 'us-east-1'))
 
 class MorningRushStress:
     """
@@ -28,15 +57,17 @@ class MorningRushStress:
     - CloudWatch dashboard shows CPU and latency anomalies
     """
 
-    def __init__(self):
+    def __init__(self, seed=None):
         self.scenario_name = "MorningRush"
+        # Seeded, the generated orders are the same on every run
+        self.random = random.Random(seed)
 
     def _validate_complex_order(self):
         """CPU-intensive order validation"""
         order_data = {
-            'items': [{'id': f'item-{i}', 'qty': random.randint(1, 10)} for i in range(100)],
-            'customer_tier': random.choice(['bronze', 'silver', 'gold', 'platinum']),
-            'delivery_urgency': random.choice(['standard', 'express', 'rush']),
+            'items': [{'id': f'item-{i}', 'qty': self.random.randint(1, 10)} for i in range(100)],
+            'customer_tier': self.random.choice(['bronze', 'silver', 'gold', 'platinum']),
+            'delivery_urgency': self.random.choice(['standard', 'express', 'rush']),
         }
 
         # JSON serialization/deserialization
@@ -51,7 +82,7 @@ class MorningRushStress:
         score = 0
         for i in range(1000):
             # Hash calculations
-            data = f"{order}{i}{random.random()}".encode()
+            data = f"{order}{i}{self.random.random()}".encode()
             hash_result = hashlib.sha256(data).hexdigest()
 
             # Simulate pattern matching
@@ -59,7 +90,7 @@ class MorningRushStress:
 
         return score % 100  # Return fraud score 0-100
 
-    def _inventory_reservation(self, order):
+    def _inventory_reservation(self, order, pace=None):
         """CPU-intensive inventory check with Fibonacci calculations"""
         def fibonacci(n):
             if n <= 1:
@@ -71,12 +102,14 @@ class MorningRushStress:
         for item in order.get('items', [])[:10]:  # Limit to prevent stack overflow
             qty = item.get('qty', 1)
             total_complexity += fibonacci(min(20 + qty, 30))
+            if pace is not None:
+                pace()
 
         return total_complexity
 
     def _tax_calculation(self):
         """Floating point operations for tax calculation"""
-        base = random.uniform(1.0, 100.0)
+        base = self.random.uniform(1.0, 100.0)
         result = base
 
         for _ in range(10000):
@@ -87,87 +120,124 @@ class MorningRushStress:
 
         return result
 
-    def simulate(self, duration_seconds=300, target_cpu=95):
+    def _process_orders(self, should_stop=None, pace=None):
+        """Simulate processing multiple concurrent orders, pacing between steps"""
+        pace = pace or (lambda: None)
+        for _ in range(10):
+            if should_stop is not None and should_stop():
+                break
+
+            # 1. Complex order validation
+            order = self._validate_complex_order()
+            pace()
+
+            # 2. Fraud scoring (SHA256 hashing)
+            fraud_score = self._fraud_check(order)
+            pace()
+
+            # 3. Inventory reservation (Fibonacci)
+            inventory_complexity = self._inventory_reservation(order, pace)
+
+            # 4. Tax calculation (floating point)
+            tax_amount = self._tax_calculation()
+            pace()
+
+    def _report(self, iteration, current_cpu, target_cpu, elapsed):
+        """Emit CloudWatch metrics"""
+        try:
+            cloudwatch.put_metric_data(
+                Namespace='CloudCafe/OrderService',
+                MetricData=[
+                    {
+                        'MetricName': 'CPUStressLevel',
+                        'Value': current_cpu,
+                        'Unit': 'Percent',
+                        'Dimensions': [
+                            {'Name': 'Scenario', 'Value': self.scenario_name}
+                        ],
+                        'Timestamp': datetime.utcnow()
+                    },
+                    {
+                        # The profile's target, to overlay on CPUStressLevel
+                        'MetricName': 'StressTargetCPU',
+                        'Value': target_cpu,
+                        'Unit': 'Percent',
+                        'Dimensions': [
+                            {'Name': 'Scenario', 'Value': self.scenario_name}
+                        ],
+                        'Timestamp': datetime.utcnow()
+                    },
+                    {
+                        'MetricName': 'StressIterations',
+                        'Value': iteration,
+                        'Unit': 'Count',
+                        'Dimensions': [
+                            {'Name': 'Scenario', 'Value': self.scenario_name}
+                        ],
+                        'Timestamp': datetime.utcnow()
+                    }
+                ]
+            )
+
+            print(f"[{int(elapsed)}s] Iteration {iteration} | CPU: {current_cpu:.1f}% (target {target_cpu:.0f}%)")
+        except Exception as e:
+            print(f"CloudWatch metric error: {e}")
+
+    def simulate(self, duration_seconds=300, target_cpu=95, progress=None, should_stop=None, workers=1,
+                 profile=None):
         """
         Run the morning rush stress simulation
 
         Args:
             duration_seconds: How long to run the stress (default 5 minutes)
             target_cpu: Target CPU utilization percentage (default 95%)
+            progress: Optional callback(iteration, cpu_percent, elapsed_seconds)
+            should_stop: Optional callable; the run ends early once it returns True
+            workers: Worker processes; 1 runs in this process (one core at
+                most, because of the GIL), None starts one per core
+            profile: Optional StressProfile of ramping target stages; it
+                replaces duration_seconds and target_cpu, and its seed
+                replaces the one the scenario was created with
         """
+        if workers is None:
+            workers = default_workers()
+        if profile is None:
+            profile = StressProfile.flat(duration_seconds, target_cpu)
+        elif profile.seed is not None:
+            self.random.seed(profile.seed)
+        duration_seconds = profile.duration
+
         print(f"\n{'='*80}")
         print(f"🔥 STRESS SCENARIO: MORNING RUSH")
         print(f"{'='*80}")
         print(f"Story: 7:45 AM Monday. Corporate bulk orders flooding in.")
-        print(f"Duration: {duration_seconds} seconds")
-        print(f"Target CPU: {target_cpu}%")
+        print(f"Duration: {duration_seconds:g} seconds")
+        print(f"Target CPU: " + ' -> '.join(f"{target:g}%" for _, target in profile.stages))
+        print(f"Worker processes: {workers}")
         print(f"{'='*80}\n")
 
         start_time = time.time()
-        iteration = 0
-
-        while time.time() - start_time < duration_seconds:
-            iteration += 1
-
-            # Simulate processing multiple concurrent orders
-            for _ in range(10):
-                # 1. Complex order validation
-                order = self._validate_complex_order()
-
-                # 2. Fraud scoring (SHA256 hashing)
-                fraud_score = self._fraud_check(order)
-
-                # 3. Inventory reservation (Fibonacci)
-                inventory_complexity = self._inventory_reservation(order)
-
-                # 4. Tax calculation (floating point)
-                tax_amount = self._tax_calculation()
-
-            # Get current CPU usage
-            current_cpu = psutil.cpu_percent(interval=0.1)
-
-            # Emit CloudWatch metrics
-            if iteration % 10 == 0:  # Every 10 iterations
-                try:
-                    cloudwatch.put_metric_data(
-                        Namespace='CloudCafe/OrderService',
-                        MetricData=[
-                            {
-                                'MetricName': 'CPUStressLevel',
-                                'Value': current_cpu,
-                                'Unit': 'Percent',
-                                'Dimensions': [
-                                    {'Name': 'Scenario', 'Value': self.scenario_name}
-                                ],
-                                'Timestamp': datetime.utcnow()
-                            },
-                            {
-                                'MetricName': 'StressIterations',
-                                'Value': iteration,
-                                'Unit': 'Count',
-                                'Dimensions': [
-                                    {'Name': 'Scenario', 'Value': self.scenario_name}
-                                ],
-                                'Timestamp': datetime.utcnow()
-                            }
-                        ]
-                    )
-
-                    print(f"[{int(time.time() - start_time)}s] Iteration {iteration} | CPU: {current_cpu:.1f}%")
-                except Exception as e:
-                    print(f"CloudWatch metric error: {e}")
-
-            # Adaptive delay to hit target CPU
-            if current_cpu < target_cpu - 10:
-                time.sleep(0.001)  # Too low, work harder
-            elif current_cpu > target_cpu + 10:
-                time.sleep(0.1)    # Too high, back off
+        # Samples CPU on its own thread and sets the workload's duty cycle
+        controller = DutyCycleController(profile.target_at(0), schedule=profile.target_at)
+        with controller:
+            if workers > 1:
+                worker_iterations = self._simulate_processes(workers, duration_seconds, controller, progress,
+                                                             should_stop, profile.seed)
+                iteration = sum(worker_iterations)
+            else:
+                iteration = self._simulate_inline(duration_seconds, controller, progress, should_stop)
+                worker_iterations = [iteration]
+        cpu_tracking = controller.stats()
+        timeline = profile.timeline(start_time, controller.samples)
 
         elapsed = time.time() - start_time
         print(f"\n{'='*80}")
         print(f"✅ STRESS COMPLETE")
         print(f"Total time: {elapsed:.1f}s")
         print(f"Total iterations: {iteration}")
+        if cpu_tracking['samples']:
+            print(f"CPU: mean {cpu_tracking['mean_cpu']}% for target {cpu_tracking['target_cpu']}% "
+                  f"(mean error {cpu_tracking['mean_abs_error']} points)")
         print(f"{'='*80}\n")
 
         # Final metric
@@ -186,3 +256,91 @@ class MorningRushStress:
             )
         except Exception as e:
             print(f"Final metric error: {e}")
+
+        return {
+            'iterations': iteration,
+            'elapsed_seconds': elapsed,
+            'workers': workers,
+            'worker_iterations': worker_iterations,
+            'cpu_tracking': cpu_tracking,
+            'profile': profile.to_dict(),
+            'timeline': timeline,
+        }
+
+    def _simulate_inline(self, duration_seconds, controller, progress, should_stop):
+        start_time = time.time()
+        iteration = 0
+
+        def finished():
+            return time.time() - start_time >= duration_seconds
+
+        while time.time() - start_time < duration_seconds:
+            if should_stop is not None and should_stop():
+                print("Stress run cancelled")
+                break
+
+            iteration += 1
+            # Stop mid-batch at the end of the profile, not after the batch
+            self._process_orders(lambda: finished() or (should_stop is not None and should_stop()),
+                                 controller.pace)
+
+            current_cpu = controller.cpu_percent
+            if progress is not None:
+                progress(iteration, current_cpu, time.time() - start_time)
+
+            if iteration % 10 == 0 and current_cpu is not None:  # Every 10 iterations
+                self._report(iteration, current_cpu, controller.target_cpu, time.time() - start_time)
+
+        return iteration
+
+    def _simulate_processes(self, workers, duration_seconds, controller, progress, should_stop, seed):
+        """
+        Spread the work over worker processes, one core each. The controller
+        runs here; its duty cycle is shared with the workers. Returns each
+        worker's iteration count.
+        """
+        # spawn: workers start clean, without this process's clients or handlers
+        context = multiprocessing.get_context('spawn')
+        stop = context.Event()
+        duty = context.Value('d', controller.duty, lock=False)
+        counters = [context.Value('q', 0) for _ in range(workers)]
+        processes = [
+            # Seeded workers each get their own, repeatable stream of orders
+            context.Process(target=_rush_worker,
+                            args=(counter, stop, duty, os.getpid(), None if seed is None else seed + index),
+                            name=f"morning-rush-{index}", daemon=True)
+            for index, counter in enumerate(counters)
+        ]
+        for process in processes:
+            process.start()
+
+        start_time = time.time()
+        last_report = start_time
+        try:
+            while time.time() - start_time < duration_seconds:
+                if should_stop is not None and should_stop():
+                    print("Stress run cancelled")
+                    break
+                if not any(process.is_alive() for process in processes):
+                    raise RuntimeError('all stress worker processes exited')
+
+                time.sleep(0.1)
+                duty.value = controller.duty
+                current_cpu = controller.cpu_percent
+                iteration = sum(counter.value for counter in counters)
+
+                if progress is not None:
+                    progress(iteration, current_cpu, time.time() - start_time)
+
+                # Emit CloudWatch metrics about every 10 s
+                if time.time() - last_report >= 10 and current_cpu is not None:
+                    last_report = time.time()
+                    self._report(iteration, current_cpu, controller.target_cpu, last_report - start_time)
+        finally:
+            stop.set()
+            for process in processes:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+
+        return [counter.value for counter in counters]
@@ -0,0 +1,160 @@
+"""
+Ramp profiles for the stress scenarios
+
+A profile describes a run the way the k6 scenarios in load-testing/ do:
+stages that each ramp the target linearly to a new value over a duration.
+The target here is task CPU percent, which DutyCycleController follows.
+
+    {
+        "name": "morning-rush",
+        "seed": 745,
+        "start_cpu": 0,
+        "stages": [
+            {"duration": "2m", "target_cpu": 40},
+            {"duration": "5m", "target_cpu": 70},
+            {"duration": "30s", "target_cpu": 70}
+        ]
+    }
+
+Durations are seconds or k6-style strings ("90s", "5m", "1h"). The seed
+makes the scenario's generated orders repeatable. Profiles are JSON, or
+YAML when PyYAML is installed; shared ones live in load-testing/profiles/.
+"""
+
+import re
+import json
+
+_DURATION = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h)?\s*$')
+_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600, None: 1}
+
+
+class ProfileError(ValueError):
+    """Raised for an invalid stress profile"""
+
+
+def parse_duration(value):
+    """Seconds for 90, 90.5, "90s", "5m" or "1h"""
+    if isinstance(value, bool):
+        raise ProfileError(f"invalid duration: {value!r}")
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        match = _DURATION.match(str(value))
+        if not match:
+            raise ProfileError(f"invalid duration: {value!r}")
+        seconds = float(match.group(1)) * _UNITS[match.group(2)]
+    if seconds <= 0:
+        raise ProfileError(f"duration must be positive: {value!r}")
+    return seconds
+
+
+def _cpu(value, field):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 100:
+        raise ProfileError(f"{field} must be a number from 0 to 100")
+    return float(value)
+
+
+class StressProfile:
+    """Target CPU over time: linear ramps between stage targets"""
+
+    def __init__(self, stages, start_cpu=0.0, seed=None, name=None):
+        if not stages:
+            raise ProfileError('a profile needs at least one stage')
+        self.stages = stages  # [(duration_seconds, target_cpu)]
+        self.start_cpu = start_cpu
+        self.seed = seed
+        self.name = name
+
+    @classmethod
+    def flat(cls, duration_seconds, target_cpu, seed=None):
+        """Hold one target for the whole run, as the original parameters did"""
+        return cls([(parse_duration(duration_seconds), _cpu(target_cpu, 'target_cpu'))],
+                   start_cpu=_cpu(target_cpu, 'target_cpu'), seed=seed, name='flat')
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict):
+            raise ProfileError('a profile must be an object')
+        stages = data.get('stages')
+        if not isinstance(stages, list) or not stages:
+            raise ProfileError('stages must be a non-empty list')
+        parsed = []
+        for index, stage in enumerate(stages):
+            if not isinstance(stage, dict) or 'duration' not in stage or 'target_cpu' not in stage:
+                raise ProfileError(f"stage {index} needs a duration and a target_cpu")
+            parsed.append((parse_duration(stage['duration']), _cpu(stage['target_cpu'], f"stage {index} target_cpu")))
+
+        seed = data.get('seed')
+        if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int)):
+            raise ProfileError('seed must be an integer')
+        return cls(parsed, start_cpu=_cpu(data.get('start_cpu', 0), 'start_cpu'), seed=seed, name=data.get('name'))
+
+    @classmethod
+    def load(cls, path):
+        """Read a profile from a .json, .yaml or .yml file"""
+        with open(path) as f:
+            text = f.read()
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ProfileError('YAML profiles need PyYAML (pip install pyyaml)')
+            data = yaml.safe_load(text)
+        else:
+            try:
+                data = json.loads(text)
+            except ValueError as e:
+                raise ProfileError(f"invalid JSON profile: {e}")
+        return cls.from_dict(data)
+
+    @property
+    def duration(self):
+        return sum(duration for duration, _ in self.stages)
+
+    def stage_at(self, elapsed):
+        """(index, stage start offset, from_cpu) of the stage running at elapsed"""
+        start = 0.0
+        from_cpu = self.start_cpu
+        for index, (duration, target) in enumerate(self.stages):
+            if elapsed < start + duration or index == len(self.stages) - 1:
+                return index, start, from_cpu
+            start += duration
+            from_cpu = target
+
+    def target_at(self, elapsed):
+        """Target CPU percent at elapsed seconds into the run"""
+        index, start, from_cpu = self.stage_at(elapsed)
+        duration, target = self.stages[index]
+        progress = min(max((elapsed - start) / duration, 0.0), 1.0)
+        return from_cpu + (target - from_cpu) * progress
+
+    def timeline(self, started_at, samples):
+        """
+        Stage boundaries as epoch seconds, with the CPU achieved in each,
+        for overlaying a run on dashboards. samples are the controller's
+        (elapsed, cpu, target) tuples.
+        """
+        entries = []
+        start = 0.0
+        from_cpu = self.start_cpu
+        for index, (duration, target) in enumerate(self.stages):
+            achieved = [cpu for elapsed, cpu, _ in samples if start <= elapsed < start + duration]
+            entries.append({
+                'stage': index,
+                'start': round(started_at + start, 3),
+                'end': round(started_at + start + duration, 3),
+                'from_cpu': from_cpu,
+                'to_cpu': target,
+                'mean_cpu': round(sum(achieved) / len(achieved), 1) if achieved else None,
+            })
+            start += duration
+            from_cpu = target
+        return entries
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'seed': self.seed,
+            'start_cpu': self.start_cpu,
+            'stages': [{'duration': duration, 'target_cpu': target} for duration, target in self.stages],
+        }
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Order endpoint benchmark for the order service, against stubbed backends
+
+Runs the Flask app from main.py in this process with every backend
+replaced by an in-memory stub (benchmarks/stubs.py): DynamoDB, Kinesis,
+CloudWatch, Postgres and Redis each wait a configurable time per round
+trip, so the numbers cover the service's own work plus the backend waits
+you choose, with no deployed stack and no network. Each of --concurrency
+client threads creates an order with POST /orders and reads it back with
+GET /orders/<id> until time runs out. Reports requests/s and p50/p95/p99
+latency per endpoint.
+
+Save a run with --output and pass it as --baseline to a later run to see
+the change:
+
+    python benchmarks/order_endpoints.py --output before.json
+    python benchmarks/order_endpoints.py --baseline before.json
+
+Usage:
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/order_endpoints.py --concurrency 16 --duration 20 \\
+        --latency-ms dynamodb=8 rds=4 redis=0.5
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+sys.path.insert(0, APP_DIR)
+
+ENDPOINTS = ('POST /orders', 'GET /orders/<id>')
+
+PRICES = {'espresso': 3.0, 'latte': 4.75, 'cappuccino': 4.5, 'croissant': 3.5}
+
+ORDER = {
+    'customer_id': 'bench-customer',
+    'store_id': 1,
+    'items': [{'item_id': 'latte', 'quantity': 2}, {'item_id': 'croissant', 'quantity': 1}],
+}
+
+
+def load_app(latency, prices=PRICES):
+    """Import main with its clients and pool pointed at fresh stubs"""
+    for name in ('DB_HOST', 'PROMETHEUS_MULTIPROC_DIR'):
+        os.environ.pop(name, None)
+    os.environ.setdefault('AWS_REGION', 'us-east-1')
+
+    import stubs
+    backends = stubs.install(latency, prices)
+    import main
+    main.app.logger.setLevel(logging.ERROR)
+    return main, backends
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def drive(app, concurrency, duration):
+    """Each client thread creates an order and then reads it back, until time runs out"""
+    latencies = {endpoint: [] for endpoint in ENDPOINTS}
+    errors = {endpoint: 0 for endpoint in ENDPOINTS}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        http = app.test_client()
+        mine = {endpoint: [] for endpoint in ENDPOINTS}
+        failed = {endpoint: 0 for endpoint in ENDPOINTS}
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = http.post('/orders', json=ORDER)
+            mine['POST /orders'].append((time.perf_counter() - start) * 1000)
+            if response.status_code != 201:
+                failed['POST /orders'] += 1
+                continue
+
+            start = time.perf_counter()
+            response = http.get(f"/orders/{response.get_json()['order_id']}")
+            mine['GET /orders/<id>'].append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                failed['GET /orders/<id>'] += 1
+
+        with lock:
+            for endpoint in ENDPOINTS:
+                latencies[endpoint].extend(mine[endpoint])
+                errors[endpoint] += failed[endpoint]
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return latencies, errors, elapsed
+
+
+def summarize(latencies, errors, elapsed):
+    endpoints = {}
+    for endpoint in ENDPOINTS:
+        values = latencies[endpoint]
+        endpoints[endpoint] = {
+            'requests': len(values),
+            'errors': errors[endpoint],
+            'requests_per_second': len(values) / elapsed,
+            'latency_ms': {
+                'p50': percentile(values, 50),
+                'p95': percentile(values, 95),
+                'p99': percentile(values, 99),
+            },
+        }
+    requests = sum(e['requests'] for e in endpoints.values())
+    return {
+        'requests': requests,
+        'requests_per_second': requests / elapsed,
+        'elapsed_seconds': elapsed,
+        'endpoints': endpoints,
+    }
+
+
+def parse_latency(values):
+    overrides = {}
+    for value in values:
+        backend, _, ms = value.partition('=')
+        if backend not in ('dynamodb', 'kinesis', 'cloudwatch', 'rds', 'redis') or not ms:
+            raise argparse.ArgumentTypeError(f"expected <backend>=<ms>, got {value!r}")
+        overrides[backend] = float(ms)
+    return overrides
+
+
+def print_comparison(result, baseline):
+    def change(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else 'n/a'
+
+    print(f"vs {baseline['label']}:")
+    print(f"  {'total':18s} req/s {change(result['requests_per_second'], baseline['requests_per_second'])}")
+    for endpoint in ENDPOINTS:
+        new, old = result['endpoints'][endpoint], baseline['endpoints'].get(endpoint)
+        if old is None:
+            continue
+        print(f"  {endpoint:18s} req/s {change(new['requests_per_second'], old['requests_per_second'])}  " +
+              '  '.join(f"{p} {change(new['latency_ms'][p], old['latency_ms'][p])}" for p in ('p50', 'p95', 'p99')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=16, help='client threads')
+    parser.add_argument('--duration', type=float, default=20, help='seconds to measure')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds to run before measuring')
+    parser.add_argument('--latency-ms', nargs='*', default=[], metavar='BACKEND=MS',
+                        help='per round trip; backends: dynamodb, kinesis, cloudwatch, rds, redis')
+    parser.add_argument('--label', help='name for this run in the JSON output')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON from an earlier run to compare against')
+    args = parser.parse_args()
+
+    try:
+        overrides = parse_latency(args.latency_ms)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    # Backpressure warnings are summarized in the output instead
+    logging.basicConfig(level=logging.ERROR)
+
+    import stubs
+    latency = stubs.Latency(**overrides)
+    service, backends = load_app(latency)
+
+    if args.warmup:
+        drive(service.app, args.concurrency, args.warmup)
+    latencies, errors, elapsed = drive(service.app, args.concurrency, args.duration)
+
+    result = summarize(latencies, errors, elapsed)
+    result.update({
+        'label': args.label or time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'concurrency': args.concurrency,
+        'duration_seconds': args.duration,
+        'backend_latency_ms': latency.ms,
+        # Work the request path handed off, e.g. dropped CloudWatch calls
+        'db_pool': backends.pool.stats(),
+        'db_reader_pool': backends.reader_pool.stats(),
+        'db_routing': service.db.routing_stats(),
+        'dispatch': service.dispatch.get_dispatcher().stats(),
+        'kinesis_producer': service.order_events.stats(),
+    })
+
+    print(f"{result['requests_per_second']:8.1f} req/s at concurrency {args.concurrency}  "
+          f"(backend ms: {', '.join(f'{k}={v:g}' for k, v in latency.ms.items())})")
+    for endpoint, stats in result['endpoints'].items():
+        latency_ms = stats['latency_ms']
+        print(f"  {endpoint:18s} {stats['requests_per_second']:8.1f} req/s  p50={latency_ms['p50']:.1f}ms "
+              f"p95={latency_ms['p95']:.1f}ms p99={latency_ms['p99']:.1f}ms  errors={stats['errors']}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            print_comparison(result, json.load(f))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Realistic stress for the order service: generated orders through create_order
+
+The stress scenarios in app/stress.py burn CPU on synthetic work. This one
+replays generated orders (random customers, stores, menu items and
+quantities, repeatable with --seed) through POST /orders of the Flask app
+from main.py, in this process: request parsing, pricing, serialization,
+the DynamoDB, RDS, Redis and outbox writes, connection pool checkouts and
+the dispatched CloudWatch calls are the real code.
+
+Backends are the in-memory stubs from benchmarks/stubs.py (--latency-ms
+sets their round trip), or with --backends local whatever the environment
+points at: DB_HOST, REDIS_HOST and AWS_ENDPOINT_URL (moto, LocalStack).
+
+The load follows a ramp profile (app/stress_profile.py, shared with the
+stress scenarios in load-testing/profiles/): client threads pace
+themselves so the CPU tracks the profile's target. For every profile stage
+it reports the CPU reached, orders/s, request latency percentiles, CPU ms
+per order and the mean time of each create_order step (the
+order_service_stage_duration_seconds histogram), which is what to plan
+task capacity from. With stubs the CPU includes the stubs' own work,
+fakeredis's Lua scripts mostly.
+
+Usage:
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/order_replay.py --duration 60 --target-cpu 70
+    python benchmarks/order_replay.py --profile ../../load-testing/profiles/morning-rush.json \\
+        --concurrency 16 --latency-ms dynamodb=8 rds=4 --output rush.json
+"""
+
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+
+from order_endpoints import load_app, parse_latency, percentile
+
+from cpu_controller import DutyCycle, DutyCycleController
+from stress_profile import ProfileError, StressProfile
+
+MENU = {
+    'espresso': 3.0, 'americano': 3.25, 'latte': 4.75, 'cappuccino': 4.5, 'flat-white': 4.5,
+    'mocha': 5.25, 'cold-brew': 4.25, 'chai-latte': 4.95, 'matcha-latte': 5.45, 'hot-chocolate': 3.95,
+    'croissant': 3.5, 'pain-au-chocolat': 3.95, 'blueberry-muffin': 3.25, 'bagel': 2.95,
+    'breakfast-sandwich': 6.5, 'avocado-toast': 7.95, 'yogurt-parfait': 4.5, 'banana-bread': 3.25,
+}
+
+STORES = 50
+CUSTOMERS = 20000
+
+
+class OrderGenerator:
+    """Orders shaped like the morning rush: mostly one or two drinks, some office runs"""
+
+    def __init__(self, seed=None):
+        self.random = random.Random(seed)
+        self.items = sorted(MENU)
+
+    def order(self):
+        # One in ten is an office run of up to 12 items
+        count = self.random.randint(5, 12) if self.random.random() < 0.1 else self.random.randint(1, 3)
+        return {
+            'customer_id': f"customer-{self.random.randrange(CUSTOMERS)}",
+            'store_id': self.random.randint(1, STORES),
+            'items': [
+                {'item_id': item_id, 'quantity': self.random.choice((1, 1, 1, 2, 3))}
+                for item_id in self.random.sample(self.items, min(count, len(self.items)))
+            ],
+        }
+
+
+def step_totals(metrics):
+    """{step: (seconds, count)} of the create_order steps observed so far"""
+    totals = {}
+    for family in metrics.STAGE_DURATION.collect():
+        for sample in family.samples:
+            if sample.labels.get('endpoint') != 'create_order':
+                continue
+            step = sample.labels['stage']
+            seconds, count = totals.get(step, (0.0, 0))
+            if sample.name.endswith('_sum'):
+                totals[step] = (sample.value, count)
+            elif sample.name.endswith('_count'):
+                totals[step] = (seconds, int(sample.value))
+    return totals
+
+
+def replay(app, metrics, profile, concurrency, seed):
+    """
+    Drive POST /orders from concurrency client threads for the profile's
+    duration; returns (requests, boundaries, controller). requests are
+    (start offset, latency ms, ok); boundaries hold process CPU seconds and
+    step totals at the start of each profile stage and at the end.
+    """
+    requests = []
+    lock = threading.Lock()
+    stop = threading.Event()
+    controller = DutyCycleController(profile.target_at(0), schedule=profile.target_at)
+
+    def client(index):
+        http = app.test_client()
+        orders = OrderGenerator(None if seed is None else seed + index)
+        # Each thread paces itself; the controller corrects for how they overlap
+        cycle = DutyCycle(lambda: controller.duty)
+        mine = []
+        while not stop.is_set():
+            order = orders.order()
+            start = time.perf_counter()
+            response = http.post('/orders', json=order)
+            mine.append((start - started, (time.perf_counter() - start) * 1000, response.status_code == 201))
+            cycle.pace()
+        with lock:
+            requests.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(index,), name=f"replay-{index}") for index in range(concurrency)]
+    boundaries = []
+    with controller:
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        offset = 0.0
+        for duration, _ in profile.stages:
+            boundaries.append((time.process_time(), step_totals(metrics)))
+            offset += duration
+            time.sleep(max(0.0, offset - (time.perf_counter() - started)))
+        boundaries.append((time.process_time(), step_totals(metrics)))
+        stop.set()
+        for thread in threads:
+            thread.join()
+    return requests, boundaries, controller
+
+
+def summarize(profile, requests, boundaries, controller, started_at):
+    stages = []
+    timeline = profile.timeline(started_at, controller.samples)
+    offset = 0.0
+    for index, (duration, _) in enumerate(profile.stages):
+        in_stage = [(ms, ok) for start, ms, ok in requests if offset <= start < offset + duration]
+        latencies = [ms for ms, _ in in_stage]
+        (cpu_start, steps_start), (cpu_end, steps_end) = boundaries[index], boundaries[index + 1]
+        steps = {}
+        for step, (seconds, count) in steps_end.items():
+            seconds_before, count_before = steps_start.get(step, (0.0, 0))
+            if count > count_before:
+                steps[step] = round((seconds - seconds_before) / (count - count_before) * 1000, 3)
+        stages.append({
+            'stage': index,
+            'from_cpu': timeline[index]['from_cpu'],
+            'to_cpu': timeline[index]['to_cpu'],
+            'mean_cpu': timeline[index]['mean_cpu'],
+            'orders': len(in_stage),
+            'errors': sum(1 for _, ok in in_stage if not ok),
+            'orders_per_second': round(len(in_stage) / duration, 1),
+            'latency_ms': {p: round(percentile(latencies, p), 2) for p in (50, 95, 99)},
+            'cpu_ms_per_order': round((cpu_end - cpu_start) / len(in_stage) * 1000, 3) if in_stage else None,
+            'step_ms': steps,
+        })
+        offset += duration
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', help='ramp profile (JSON, or YAML with PyYAML); replaces --duration/--target-cpu')
+    parser.add_argument('--duration', type=float, default=60, help='seconds, without --profile')
+    parser.add_argument('--target-cpu', type=float, default=70, help='percent, without --profile')
+    parser.add_argument('--concurrency', type=int, default=16, help='client threads')
+    parser.add_argument('--seed', type=int, help="order generator seed; defaults to the profile's")
+    parser.add_argument('--backends', choices=('stub', 'local'), default='stub',
+                        help='in-memory stubs, or the backends DB_HOST/REDIS_HOST/AWS_ENDPOINT_URL point at')
+    parser.add_argument('--latency-ms', nargs='*', default=[], metavar='BACKEND=MS',
+                        help='stub round trip; backends: dynamodb, kinesis, cloudwatch, rds, redis')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    try:
+        overrides = parse_latency(args.latency_ms)
+        profile = (StressProfile.load(args.profile) if args.profile
+                   else StressProfile.flat(args.duration, args.target_cpu))
+    except (argparse.ArgumentTypeError, ProfileError, OSError) as e:
+        parser.error(str(e))
+    seed = args.seed if args.seed is not None else profile.seed
+
+    # Backpressure warnings are summarized in the output instead
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.backends == 'stub':
+        import stubs
+        latency = stubs.Latency(**overrides)
+        service, _ = load_app(latency, MENU)
+        backend_latency = latency.ms
+    else:
+        import main as service
+        service.app.logger.setLevel(logging.ERROR)
+        backend_latency = None
+
+    # First requests pay for lazy clients and the price index load
+    http = service.app.test_client()
+    warmup = OrderGenerator(seed)
+    for _ in range(20):
+        http.post('/orders', json=warmup.order())
+
+    print(f"Replaying orders for {profile.duration:g}s, target CPU "
+          + ' -> '.join(f"{target:g}%" for _, target in profile.stages)
+          + f", {args.concurrency} clients, {args.backends} backends")
+    started_at = time.time()
+    requests, boundaries, controller = replay(service.app, service.metrics, profile, args.concurrency, seed)
+    stages = summarize(profile, requests, boundaries, controller, started_at)
+
+    for stage in stages:
+        latency_ms = stage['latency_ms']
+        cpu = f"{stage['mean_cpu']:5.1f}%" if stage['mean_cpu'] is not None else '    -'
+        per_order = f"{stage['cpu_ms_per_order']:.2f}" if stage['cpu_ms_per_order'] is not None else '-'
+        print(f"  stage {stage['stage']}  {stage['from_cpu']:g}->{stage['to_cpu']:g}%  cpu {cpu}  "
+              f"{stage['orders_per_second']:7.1f} orders/s  p50={latency_ms[50]:.1f}ms p95={latency_ms[95]:.1f}ms "
+              f"p99={latency_ms[99]:.1f}ms  cpu/order={per_order}ms  errors={stage['errors']}")
+        if stage['step_ms']:
+            print('    ' + '  '.join(f"{step}={ms:.2f}ms" for step, ms in sorted(stage['step_ms'].items())))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'profile': profile.to_dict(),
+                'seed': seed,
+                'concurrency': args.concurrency,
+                'backends': args.backends,
+                'backend_latency_ms': backend_latency,
+                'cpu_tracking': controller.stats(),
+                'stages': stages,
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
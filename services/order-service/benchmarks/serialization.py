@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+JSON encoding micro-benchmark for the order service
+
+Compares the stdlib json module (with a Decimal-aware default hook, as the
+service would need) against serialization.py (orjson) on orders shaped like
+the ones the service handles: a DynamoDB item with Decimal prices, a
+datetime, 5 or 100 line items. Reports microseconds per encode and per
+decode, and the encoded size.
+
+Usage:
+    python benchmarks/serialization.py --number 20000
+"""
+
+import os
+import sys
+import json
+import uuid
+import timeit
+import argparse
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+import serialization  # noqa: E402
+
+MENU = [
+    ('espresso', 'Espresso', Decimal('3.00')),
+    ('latte', 'Caffe Latte', Decimal('4.75')),
+    ('cappuccino', 'Cappuccino', Decimal('4.50')),
+    ('mocha', 'Caffe Mocha', Decimal('5.25')),
+    ('croissant', 'Butter Croissant', Decimal('3.50')),
+]
+
+
+def make_order(item_count):
+    """An order as read back from DynamoDB"""
+    items = []
+    for i in range(item_count):
+        item_id, name, price = MENU[i % len(MENU)]
+        items.append({'item_id': item_id, 'name': name, 'price': price, 'quantity': Decimal(1 + i % 3)})
+    created_at = Decimal(1_700_000_000)
+    return {
+        'order_id': str(uuid.uuid4()),
+        'customer_id': 'customer-abc123',
+        'store_id': '42',
+        'store_status': '42#pending',
+        'items': items,
+        'total_amount': sum(item['price'] * item['quantity'] for item in items),
+        'status': 'pending',
+        'created_at': created_at,
+        'ttl': created_at + 86400,
+        'price_version': Decimal(1234),
+        'updated_at': datetime(2024, 1, 15, 8, 30, 12, 123456),
+    }
+
+
+def stdlib_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def stdlib_dumps(order):
+    return json.dumps(order, default=stdlib_default)
+
+
+def run(item_count, number):
+    order = make_order(item_count)
+    encoded_stdlib = stdlib_dumps(order)
+    encoded_orjson = serialization.dumps(order)
+    # Same document either way, only the whitespace differs
+    assert json.loads(encoded_stdlib) == serialization.loads(encoded_orjson)
+
+    def per_call_us(fn):
+        return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+    result = {
+        'items': item_count,
+        'stdlib': {
+            'encode_us': per_call_us(lambda: stdlib_dumps(order)),
+            'decode_us': per_call_us(lambda: json.loads(encoded_stdlib)),
+            'bytes': len(encoded_stdlib.encode()),
+        },
+        'orjson': {
+            'encode_us': per_call_us(lambda: serialization.dumpb(order)),
+            'decode_us': per_call_us(lambda: serialization.loads(encoded_orjson)),
+            'bytes': len(encoded_orjson.encode()),
+        },
+    }
+    result['encode_speedup'] = result['stdlib']['encode_us'] / result['orjson']['encode_us']
+    result['decode_speedup'] = result['stdlib']['decode_us'] / result['orjson']['decode_us']
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=20000, help='calls per timing run')
+    parser.add_argument('--items', type=int, nargs='+', default=[5, 100])
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = []
+    for item_count in args.items:
+        # Bigger documents need fewer calls for a stable timing
+        result = run(item_count, max(100, args.number * 5 // item_count))
+        results.append(result)
+        print(f"{item_count:4d} items  "
+              f"stdlib encode {result['stdlib']['encode_us']:7.1f}us decode {result['stdlib']['decode_us']:7.1f}us  "
+              f"orjson encode {result['orjson']['encode_us']:7.1f}us decode {result['orjson']['decode_us']:7.1f}us  "
+              f"speedup x{result['encode_speedup']:.1f} / x{result['decode_speedup']:.1f}  "
+              f"({result['stdlib']['bytes']} -> {result['orjson']['bytes']} bytes)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
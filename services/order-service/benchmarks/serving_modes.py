@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Flask vs ASGI serving-mode benchmark for the order service
+
+Starts a local moto server standing in for DynamoDB, Kinesis and CloudWatch,
+runs the service under gunicorn once with sync Flask workers (main:app) and
+once with uvicorn workers (asgi:app), and drives the same POST /orders +
+GET /orders/<id> mix against both. Reports requests/s per vCPU, counting one
+vCPU per gunicorn worker as on the Fargate task.
+
+RDS writes are included when DB_HOST (and DB_USER/DB_PASSWORD) point at a
+local Postgres loaded with scripts/init-rds-schema.sql, e.g.
+
+    docker run -d -p 5432:5432 -e POSTGRES_USER=cloudcafe_admin \\
+        -e POSTGRES_PASSWORD=cloudcafe -e POSTGRES_DB=cloudcafe postgres:15
+
+Usage:
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/serving_modes.py --workers 2 --concurrency 64 --duration 20
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import subprocess
+
+import boto3
+import httpx
+from moto.server import ThreadedMotoServer
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+
+MODES = {
+    'flask': ['main:app'],
+    'asgi': ['-k', 'uvicorn.workers.UvicornWorker', 'asgi:app'],
+}
+
+ORDER = {
+    'customer_id': 'bench-customer',
+    'store_id': 1,
+    'items': [{'item_id': 'latte', 'quantity': 2, 'price': 5}],
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_backends(env):
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    port = free_port()
+    server = ThreadedMotoServer(port=port, verbose=False)
+    server.start()
+    endpoint = f"http://127.0.0.1:{port}"
+
+    session = boto3.Session(
+        aws_access_key_id=env['AWS_ACCESS_KEY_ID'],
+        aws_secret_access_key=env['AWS_SECRET_ACCESS_KEY'],
+        region_name=env['AWS_REGION']
+    )
+    dynamodb = session.client('dynamodb', endpoint_url=endpoint)
+    dynamodb.create_table(
+        TableName=env['DYNAMODB_ACTIVE_ORDERS_TABLE'],
+        KeySchema=[{'AttributeName': 'order_id', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'order_id', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    kinesis = session.client('kinesis', endpoint_url=endpoint)
+    kinesis.create_stream(StreamName=env['KINESIS_ORDER_EVENTS_STREAM'], ShardCount=4)
+    return server, endpoint
+
+
+def start_service(mode, workers, env):
+    port = free_port()
+    process = subprocess.Popen(
+        ['gunicorn', '-c', 'gunicorn.conf.py', '-b', f'127.0.0.1:{port}',
+         '--workers', str(workers), '--log-level', 'warning'] + MODES[mode],
+        cwd=APP_DIR, env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{mode} service did not become healthy")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def drive(base_url, concurrency, duration):
+    """Each client creates an order and then reads it back, until time runs out"""
+    latencies = {'POST /orders': [], 'GET /orders/<id>': []}
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client(http):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await http.post('/orders', json=ORDER)
+            latencies['POST /orders'].append((time.perf_counter() - start) * 1000)
+            if response.status_code != 201:
+                errors += 1
+                continue
+
+            start = time.perf_counter()
+            response = await http.get(f"/orders/{response.json()['order_id']}")
+            latencies['GET /orders/<id>'].append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return latencies, errors, elapsed
+
+
+def run_mode(mode, args, env):
+    process, base_url = start_service(mode, args.workers, env)
+    try:
+        asyncio.run(drive(base_url, args.concurrency, min(3, args.duration)))  # warm-up
+        latencies, errors, elapsed = asyncio.run(drive(base_url, args.concurrency, args.duration))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    requests = sum(len(v) for v in latencies.values())
+    vcpus = min(args.workers, os.cpu_count() or 1)
+    return {
+        'mode': mode,
+        'workers': args.workers,
+        'concurrency': args.concurrency,
+        'requests': requests,
+        'errors': errors,
+        'requests_per_second': requests / elapsed,
+        'requests_per_second_per_vcpu': requests / elapsed / vcpus,
+        'latency_ms': {
+            endpoint: {
+                'p50': percentile(values, 50),
+                'p99': percentile(values, 99),
+            }
+            for endpoint, values in latencies.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=int, default=20, help='seconds per mode')
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['flask', 'asgi'])
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.update({
+        'AWS_REGION': 'us-east-1',
+        'AWS_ACCESS_KEY_ID': 'bench',
+        'AWS_SECRET_ACCESS_KEY': 'bench',
+        'DYNAMODB_ACTIVE_ORDERS_TABLE': 'cloudcafe-active-orders-bench',
+        'KINESIS_ORDER_EVENTS_STREAM': 'cloudcafe-order-events-bench',
+    })
+    server, env['AWS_ENDPOINT_URL'] = start_backends(env)
+
+    results = []
+    try:
+        for mode in args.modes:
+            result = run_mode(mode, args, env)
+            results.append(result)
+            print(f"{mode:6s} {result['requests_per_second']:8.1f} req/s  "
+                  f"{result['requests_per_second_per_vcpu']:8.1f} req/s/vCPU  "
+                  f"errors={result['errors']}")
+            for endpoint, latency in result['latency_ms'].items():
+                print(f"       {endpoint:18s} p50={latency['p50']:.1f}ms p99={latency['p99']:.1f}ms")
+    finally:
+        server.stop()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Startup profile for the order service
+
+Times `import main` in fresh interpreters (what every gunicorn worker, or
+the master with preload_app, pays before it can serve) and lists the
+slowest imports from `python -X importtime`. Point --app-dir at another
+checkout's app/ directory to compare two versions:
+
+    git worktree add /tmp/order-service-base HEAD~1
+    python benchmarks/startup.py --app-dir /tmp/order-service-base/services/order-service/app
+    python benchmarks/startup.py
+
+Usage:
+    python benchmarks/startup.py --runs 10 --top 15 --output startup.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+
+TIMER = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+
+def _env():
+    env = dict(os.environ)
+    # Keep the app from reaching for backends that are not there
+    for name in ('REDIS_HOST', 'DB_HOST'):
+        env.pop(name, None)
+    return env
+
+
+def import_times(app_dir, runs):
+    """Wall-clock seconds for `import main`, one fresh interpreter per run"""
+    times = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', TIMER], cwd=app_dir, env=_env(),
+                                capture_output=True, text=True, check=True).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+    return times
+
+
+def import_profile(app_dir, top):
+    """(module, self_us, cumulative_us) for the slowest imports"""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], cwd=app_dir,
+                            env=_env(), capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    modules.sort(key=lambda m: m[2], reverse=True)
+    return modules[:top], {name for name, _, _ in modules}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app-dir', default=APP_DIR, help='directory holding main.py')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=15, help='slowest imports to list')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    app_dir = os.path.abspath(args.app_dir)
+    times = import_times(app_dir, args.runs)
+    slowest, imported = import_profile(app_dir, args.top)
+
+    result = {
+        'app_dir': app_dir,
+        'runs': args.runs,
+        'import_ms': {
+            'median': statistics.median(times) * 1000,
+            'min': min(times) * 1000,
+            'max': max(times) * 1000,
+        },
+        'heavy_modules_loaded': sorted(m for m in ('boto3', 'botocore', 'psycopg2', 'psutil', 'redis')
+                                       if m in imported),
+        'slowest_imports': [{'module': name, 'self_ms': self_us / 1000, 'cumulative_ms': cumulative_us / 1000}
+                            for name, self_us, cumulative_us in slowest],
+    }
+
+    print(f"import main: median {result['import_ms']['median']:.0f} ms "
+          f"(min {result['import_ms']['min']:.0f}, max {result['import_ms']['max']:.0f}) over {args.runs} runs")
+    print(f"heavy modules loaded at import: {', '.join(result['heavy_modules_loaded']) or 'none'}")
+    print(f"{'module':40s} {'self ms':>9s} {'cumul. ms':>10s}")
+    for entry in result['slowest_imports']:
+        print(f"{entry['module']:40s} {entry['self_ms']:9.1f} {entry['cumulative_ms']:10.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
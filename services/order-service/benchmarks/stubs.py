@@ -0,0 +1,299 @@
+"""
+In-process stand-ins for the order service's backends
+
+Each stub keeps its data in memory and sleeps for a configurable time per
+round trip, so a benchmark can model a fast or a slow DynamoDB, Kinesis,
+CloudWatch, Postgres or Redis without any of them running. The sleep
+releases the GIL, as waiting on a socket would. Only the calls the order
+service makes are implemented.
+
+install() wires the stubs into clients.py and db.py; call it before
+importing main.
+"""
+
+import os
+import json
+import time
+import threading
+
+import fakeredis
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+import clients
+import db
+
+
+class Latency:
+    """Per-backend round-trip time in milliseconds"""
+
+    DEFAULTS = {'dynamodb': 5.0, 'kinesis': 20.0, 'cloudwatch': 30.0, 'rds': 3.0, 'redis': 0.5}
+
+    def __init__(self, **overrides):
+        self.ms = dict(self.DEFAULTS, **overrides)
+
+    def wait(self, backend):
+        ms = self.ms[backend]
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+
+class StubTable:
+    """The active-orders DynamoDB table"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.items = {}
+        self._lock = threading.Lock()
+
+    def put_item(self, Item, **kwargs):
+        self.latency.wait('dynamodb')
+        with self._lock:
+            self.items[Item['order_id']] = dict(Item)
+        return {}
+
+    def get_item(self, Key, **kwargs):
+        self.latency.wait('dynamodb')
+        with self._lock:
+            item = self.items.get(Key['order_id'])
+        return {'Item': dict(item)} if item is not None else {}
+
+    def query(self, **kwargs):
+        self.latency.wait('dynamodb')
+        return {'Items': []}
+
+    def batch_writer(self):
+        return _StubBatchWriter(self)
+
+
+class StubDynamoDB:
+    """The DynamoDB resource, for BatchGetItem across the stub table"""
+
+    def __init__(self, table, table_name):
+        self.table = table
+        self.table_name = table_name
+
+    def batch_get_item(self, RequestItems):
+        self.table.latency.wait('dynamodb')
+        keys = RequestItems[self.table_name]['Keys']
+        with self.table._lock:
+            items = [dict(self.table.items[key['order_id']]) for key in keys if key['order_id'] in self.table.items]
+        return {'Responses': {self.table_name: items}, 'UnprocessedKeys': {}}
+
+
+class _StubBatchWriter:
+    """One BatchWriteItem round trip per 25 items, like boto3's batch_writer"""
+
+    def __init__(self, table):
+        self.table = table
+        self.pending = []
+
+    def put_item(self, Item):
+        self.pending.append(dict(Item))
+        if len(self.pending) == 25:
+            self._flush()
+
+    def _flush(self):
+        if self.pending:
+            self.table.latency.wait('dynamodb')
+            with self.table._lock:
+                for item in self.pending:
+                    self.table.items[item['order_id']] = item
+            self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._flush()
+
+
+class StubKinesis:
+    def __init__(self, latency):
+        self.latency = latency
+        self.records = 0
+
+    def put_records(self, StreamName, Records):
+        self.latency.wait('kinesis')
+        self.records += len(Records)
+        return {
+            'FailedRecordCount': 0,
+            'Records': [{'SequenceNumber': str(i), 'ShardId': 'shardId-000000000000'} for i in range(len(Records))],
+        }
+
+
+class StubCloudWatch:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def put_metric_data(self, **kwargs):
+        self.latency.wait('cloudwatch')
+        return {}
+
+
+class StubRedis(fakeredis.FakeRedis):
+    """fakeredis (Lua 5.1, for the service's scripts) plus a round trip per command or pipeline"""
+
+    def __init__(self, latency, **kwargs):
+        super().__init__(decode_responses=True, **kwargs)
+        self.latency = latency
+
+    def execute_command(self, *args, **options):
+        self.latency.wait('redis')
+        return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        pipe = super().pipeline(transaction, shard_hint)
+        execute = pipe.execute
+
+        def timed_execute(*args, **kwargs):
+            self.latency.wait('redis')
+            return execute(*args, **kwargs)
+
+        pipe.execute = timed_execute
+        return pipe
+
+
+class StubPostgres:
+    """Rows of the orders table shared by every stub connection"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.orders = {}
+        self.lock = threading.Lock()
+
+
+class _StubCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        database = self.connection.database
+        database.latency.wait('rds')
+        if isinstance(sql, bytes):
+            sql = sql.decode()
+        statement = ' '.join(sql.split())
+        self._rows = []
+        if statement.startswith('INSERT INTO orders ') and isinstance(params, tuple):
+            order_id, customer_id, store_id, total_amount, status, created_at = params
+            with database.lock:
+                database.orders.setdefault(order_id, {
+                    'order_id': order_id, 'customer_id': customer_id, 'store_id': store_id,
+                    'total_amount': total_amount, 'status': status, 'created_at': created_at,
+                    'updated_at': None,
+                })
+        elif statement.startswith('SELECT * FROM orders WHERE order_id = ANY('):
+            with database.lock:
+                rows = [database.orders.get(order_id) for order_id in params[0]]
+            self._rows = [dict(row) for row in rows if row]
+        elif statement.startswith('SELECT * FROM orders WHERE order_id = '):
+            with database.lock:
+                row = database.orders.get(params[0])
+            self._rows = [dict(row)] if row else []
+        elif statement == 'SELECT 1':
+            self._rows = [(1,)]
+        elif statement.startswith('SELECT to_regclass('):
+            # The outbox table exists; its rows are not kept
+            self._rows = [(True,)]
+
+    def mogrify(self, template, args):
+        # Only execute_values calls this; the text never reaches a server
+        return repr(tuple(args)).encode()
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _StubConnection:
+    encoding = 'UTF8'
+
+    def __init__(self, database):
+        self.database = database
+        self.closed = 0
+        self.autocommit = False
+
+    def cursor(self, cursor_factory=None):
+        return _StubCursor(self)
+
+    def get_transaction_status(self):
+        return TRANSACTION_STATUS_IDLE
+
+    def commit(self):
+        self.database.latency.wait('rds')
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class StubPool(db.ConnectionPool):
+    """The real pool (checkout, limits, stats) handing out stub connections"""
+
+    def __init__(self, database, **kwargs):
+        super().__init__(**kwargs)
+        self.database = database
+
+    def _connect(self):
+        with self._lock:
+            self.counters['connections_opened'] += 1
+        return _StubConnection(self.database)
+
+
+class Backends:
+    """Every stub, so a benchmark can inspect what reached each backend"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.table = StubTable(latency)
+        self.dynamodb = StubDynamoDB(self.table, clients.ACTIVE_ORDERS_TABLE)
+        self.kinesis = StubKinesis(latency)
+        self.cloudwatch = StubCloudWatch(latency)
+        self.redis = StubRedis(latency)
+        self.postgres = StubPostgres(latency)
+        self.pool = StubPool(self.postgres, minconn=1, maxconn=int(os.environ.get('DB_POOL_MAX', 5)),
+                             timeout=float(os.environ.get('DB_POOL_TIMEOUT', 5)))
+        # The Aurora reader, on the same rows (no replica lag)
+        self.reader_pool = StubPool(self.postgres, minconn=1, maxconn=int(os.environ.get('DB_POOL_MAX', 5)),
+                                    timeout=float(os.environ.get('DB_POOL_TIMEOUT', 5)))
+
+
+def install(latency, prices=None):
+    """
+    Route this process's clients and database pool to fresh stubs
+
+    prices ({item_id: price}) are published the way menu-service does, so
+    orders are priced from the price index.
+    """
+    backends = Backends(latency)
+    # redis_client() only hands out a client when REDIS_HOST is set
+    os.environ['REDIS_HOST'] = 'stub'
+    clients.use('redis', backends.redis, per_process=False)
+    clients.use('resource:dynamodb', backends.dynamodb)
+    clients.use(f"table:{clients.ACTIVE_ORDERS_TABLE}", backends.table)
+    clients.use('client:kinesis', backends.kinesis)
+    clients.use('client:cloudwatch', backends.cloudwatch)
+    db.set_pool(backends.pool)
+    db.set_pool(backends.reader_pool, 'reader')
+
+    if prices:
+        from pricing import PRICES_KEY, VERSION_KEY
+        backends.redis.hset(PRICES_KEY, mapping={
+            item_id: json.dumps({'price': price, 'available': True, 'version': 1})
+            for item_id, price in prices.items()
+        })
+        backends.redis.set(VERSION_KEY, 1)
+    return backends
@@ -16,6 +16,8 @@ import os
 import time
 import hashlib
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from decimal import Decimal
 
@@ -29,6 +31,15 @@ cloudwatch = boto3.client('cloudwatch', region_name=os.environ.get('AWS_REGION',
 TRANSACTIONS_TABLE = os.environ.get('DYNAMODB_TABLE', 'cloudcafe-payment-transactions-dev')
 transactions_table = dynamodb.Table(TRANSACTIONS_TABLE)
 
+# Message groups processed at once; records within a group stay in order
+PAYMENT_CONCURRENCY = int(os.environ.get('PAYMENT_CONCURRENCY', '10'))
+
+# Kept across warm invocations, like the clients above
+_executor = ThreadPoolExecutor(max_workers=PAYMENT_CONCURRENCY, thread_name_prefix='payment')
+
+# boto3 resources are not thread-safe: each pool thread gets its own Table
+_local = threading.local()
+
 # Cold start detection
 COLD_START = True
 
@@ -59,40 +70,12 @@ def lambda_handler(event, context):
     failed_count = 0
 
     try:
-        # Process SQS records
-        for record in event.get('Records', []):
-            try:
-                # Parse payment message
-                payment = json.loads(record['body'])
-
-                # Validate payment
-                if not validate_payment(payment):
-                    print(f"❌ Invalid payment: {payment.get('payment_id')}")
-                    failed_count += 1
-                    continue
-
-                # Process payment (mock)
-                transaction = process_payment(payment)
-
-                # Fraud scoring (CPU-intensive)
-                fraud_score = calculate_fraud_score(payment)
-                transaction['fraud_score'] = fraud_score
-
-                if fraud_score > 80:
-                    print(f"⚠️ High fraud score: {fraud_score} for payment {payment['payment_id']}")
-                    transaction['status'] = 'flagged_for_review'
-                else:
-                    transaction['status'] = 'completed'
-
-                # Write to DynamoDB
-                write_transaction(transaction)
-
-                processed_count += 1
-                print(f"✅ Processed payment: {payment['payment_id']}")
-
-            except Exception as e:
-                print(f"❌ Error processing record: {e}")
-                failed_count += 1
+        # Process SQS records: message groups concurrently, each group's
+        # records one after another in queue order
+        groups = group_records(event.get('Records', []))
+        for outcomes in _executor.map(process_group, groups):
+            processed_count += sum(outcomes)
+            failed_count += len(outcomes) - sum(outcomes)
 
         duration = time.time() - start_time
 
@@ -127,6 +110,60 @@ def lambda_handler(event, context):
         }
 
 
+def group_records(records):
+    """
+    Split SQS records into lists by FIFO MessageGroupId, keeping their order
+
+    Records without a group (standard queue, local tests) carry no ordering
+    guarantee and each form their own group.
+    """
+    groups = {}
+    for index, record in enumerate(records):
+        group_id = record.get('attributes', {}).get('MessageGroupId')
+        groups.setdefault(group_id if group_id is not None else ('record', index), []).append(record)
+    return list(groups.values())
+
+
+def process_group(records):
+    """Process one message group's records in order; returns True/False per record"""
+    return [process_record(record) for record in records]
+
+
+def process_record(record):
+    """Process one SQS record; returns whether the payment was processed"""
+    try:
+        # Parse payment message
+        payment = json.loads(record['body'])
+
+        # Validate payment
+        if not validate_payment(payment):
+            print(f"❌ Invalid payment: {payment.get('payment_id')}")
+            return False
+
+        # Process payment (mock)
+        transaction = process_payment(payment)
+
+        # Fraud scoring (CPU-intensive)
+        fraud_score = calculate_fraud_score(payment)
+        transaction['fraud_score'] = fraud_score
+
+        if fraud_score > 80:
+            print(f"⚠️ High fraud score: {fraud_score} for payment {payment['payment_id']}")
+            transaction['status'] = 'flagged_for_review'
+        else:
+            transaction['status'] = 'completed'
+
+        # Write to DynamoDB
+        write_transaction(transaction)
+
+        print(f"✅ Processed payment: {payment['payment_id']}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error processing record: {e}")
+        return False
+
+
 def validate_payment(payment):
     """Validate payment data structure"""
     required_fields = ['payment_id', 'order_id', 'customer_id', 'amount', 'payment_method']
@@ -221,13 +258,27 @@ def write_transaction(transaction):
         if isinstance(transaction.get('fraud_score'), float):
             transaction['fraud_score'] = Decimal(str(transaction['fraud_score']))
 
-        transactions_table.put_item(Item=transaction)
+        _table().put_item(Item=transaction)
 
     except Exception as e:
         print(f"❌ DynamoDB write error: {e}")
         raise
 
 
+def _table():
+    """The transactions table for the calling thread"""
+    if threading.current_thread() is threading.main_thread():
+        return transactions_table
+    table = getattr(_local, 'table', None)
+    if table is None:
+        session = boto3.session.Session()
+        table = session.resource(
+            'dynamodb', region_name=os.environ.get('AWS_REGION', 'us-east-1')
+        ).Table(TRANSACTIONS_TABLE)
+        _local.table = table
+    return table
+
+
 def cold_start_cpu_stress():
     """
     CPU stress during cold start initialization